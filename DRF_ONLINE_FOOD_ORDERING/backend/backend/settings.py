@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 import os
 
 load_dotenv()
@@ -92,6 +94,7 @@ DJOSER = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -132,8 +135,22 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+# JSON encoder for API responses (core/renderers.py): 'orjson' when it is
+# installed, else the stdlib; 'stdlib' forces the latter
+API_JSON_BACKEND = os.environ.get('API_JSON_BACKEND', 'orjson')
+
+# Response compression (core/compression.py): Brotli if the brotli package
+# is installed, else gzip, for bodies of at least COMPRESSION_MIN_SIZE bytes
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5  # 0-11; mid levels suit per-request work
+
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
@@ -169,10 +186,88 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # File-backed test database: threads in the concurrency tests get
+        # real connections that wait on locks instead of failing
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# locmem for development. With more than one worker process set CACHE_URL
+# (redis://host:6379/0): the version stamps behind the menu cache and the
+# ETags (core/versioning.py) must be shared by every worker, or a change
+# made through one worker leaves the others serving stale pages and 304s.
+# core.checks refuses to start with DEBUG off and a per-process cache.
+
+CACHE_URL = os.getenv('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'atlas-burger',
+        }
+    }
+
+# Cache holding the version stamps (core/versioning.py); must be shared
+VERSION_CACHE_ALIAS = 'default'
+
+# Menu catalog cache (see core/catalog.py)
+MENU_CATALOG_CACHE_ALIAS = 'default'
+MENU_CATALOG_CACHE_TIMEOUT = 60 * 60  # seconds
+
+# Menu search (core/search.py): 'memory' (in-process index) or 'postgres' (full-text)
+MENU_SEARCH_BACKEND = 'memory'
+MENU_SEARCH_MAX_RESULTS = 50
+
+
+# Idempotency-Key replay for order creation / payment initiation (core/idempotency.py)
+IDEMPOTENCY_CACHE_ALIAS = 'default'
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds a finished response is replayed
+IDEMPOTENCY_LOCK_TIMEOUT = 60  # seconds a key stays reserved while its request runs
+
+
+# Order status push events (core/events.py, streamed by core/streams.py)
+ORDER_EVENTS_BROKER = 'core.events.InProcessBroker'
+ORDER_EVENTS_HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+ORDER_EVENTS_RETRY_MS = 3000  # EventSource reconnect delay
+
+
+# Kitchen queue delta sync (core/kitchen.py): on PostgreSQL, how many change
+# stamps before a tablet's token each delta re-sends
+KITCHEN_SYNC_LOOKBACK = 200
+
+
+# Order history / admin order list keyset pagination (core/pagination.py)
+ORDER_PAGE_SIZE = 20
+ORDER_MAX_PAGE_SIZE = 100
+
+# Review list pages (core/pagination.py) and per-item summaries (core/reviews.py)
+REVIEW_PAGE_SIZE = 10
+REVIEW_MAX_PAGE_SIZE = 50
+REVIEW_SUMMARY_LATEST = 3  # newest reviews included in a summary
+REVIEW_SUMMARY_CACHE_TIMEOUT = 60 * 60
+
+# Background jobs (core/jobs.py, run by `python manage.py run_jobs`)
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 5  # seconds, doubled on every retry
+JOB_LEASE_SECONDS = 300  # a running job older than this is assumed orphaned
+JOB_POLL_INTERVAL = 1  # seconds between polls of an empty queue
+JOB_CLAIM_BATCH = 1  # jobs claimed per poll, per worker
+JOB_RETENTION = timedelta(days=7)  # how long finished jobs are kept
+JOB_PURGE_INTERVAL = 60 * 60  # seconds between purges, per idle worker
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -222,6 +317,20 @@ STATICFILES_DIRS = [
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Resized menu image widths, in pixels (core/images.py)
+ITEM_IMAGE_WIDTHS = (160, 320, 640, 1024)
+
+# Media serving (core/media.py). Browser cache lifetime of media files, and
+# of content-hashed ones (image variants), which never change
+MEDIA_MAX_AGE = 60 * 60
+MEDIA_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# Hand file transfers to the proxy: None, 'x-accel-redirect' (nginx, with an
+# internal location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT) or
+# 'x-sendfile' (Apache mod_xsendfile / lighttpd)
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -234,6 +343,8 @@ AUTH_USER_MODEL = 'user_management.User'
 
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOWS_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
 
 
 
@@ -248,10 +359,25 @@ SITE_NAME = 'Atlas Burger'
 # Payment Settings
 CHAPA_API_URL = 'https://api.chapa.co/v1/transaction/initialize'
 CHAPA_SECRET_KEY = os.getenv('CHAPA_SECRET_KEY', '')
-CHAPA_WEBHOOK_URL = 'http://localhost:8000/payments/webhook/'
+# Where Chapa posts payment callbacks: must be this server's public URL
+CHAPA_WEBHOOK_URL = os.getenv('CHAPA_WEBHOOK_URL')
+if not CHAPA_WEBHOOK_URL:
+    if not DEBUG:
+        raise ImproperlyConfigured(
+            'Set CHAPA_WEBHOOK_URL to the public URL of /payments/webhook/; '
+            'without it Chapa cannot report completed payments'
+        )
+    CHAPA_WEBHOOK_URL = 'http://localhost:8000/payments/webhook/'
 CHAPA_RETURN_URL = 'atlasburger://payment-success?status=success'
 CHAPA_VERIFY_URL = 'https://api.chapa.co/v1/transaction/verify/'
 
+# Chapa HTTP client (payments/gateway.py): pooled connections, timeouts, retries
+CHAPA_TIMEOUT = float(os.getenv('CHAPA_TIMEOUT', 10))  # seconds, per attempt
+CHAPA_CONNECT_TIMEOUT = float(os.getenv('CHAPA_CONNECT_TIMEOUT', 3))
+CHAPA_MAX_RETRIES = int(os.getenv('CHAPA_MAX_RETRIES', 2))
+CHAPA_RETRY_BACKOFF = 0.5  # seconds, doubled on every retry
+CHAPA_MAX_CONNECTIONS = int(os.getenv('CHAPA_MAX_CONNECTIONS', 50))
+
 # Deep Link Settings
 MOBILE_APP_DEEP_LINK = 'atlasburger://payment-success'
 WEB_APP_URL = 'http://localhost:5173'
@@ -1,8 +1,12 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
-from .models import Item, Reviews, CartItems
+from .models import Item, Reviews, CartItems, DailySalesRollup, Job, next_order_change_seq
+from .catalog import bump_catalog_version
+from .images import ensure_variants as ensure_image_variants
+from .versioning import bump_version
 
 class ItemAdmin(admin.ModelAdmin):
     list_display = ('title', 'category', 'price', 'display_image', 'created_by', 'status_indicator')
@@ -43,14 +47,17 @@ class ItemAdmin(admin.ModelAdmin):
         if not obj.pk:  # Only set created_by if this is a new object
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+        ensure_image_variants(obj)
 
     def mark_as_bestseller(self, request, queryset):
         updated = queryset.update(labels='bestseller', label_colour='danger')
+        bump_catalog_version()  # update() skips the Item signals
         self.message_user(request, f'{updated} items marked as bestseller')
     mark_as_bestseller.short_description = "Mark selected as bestseller"
 
     def mark_as_new(self, request, queryset):
         updated = queryset.update(labels='new', label_colour='success')
+        bump_catalog_version()
         self.message_user(request, f'{updated} items marked as new')
     mark_as_new.short_description = "Mark selected as new"
 
@@ -106,10 +113,46 @@ class CartItemsAdmin(admin.ModelAdmin):
     status_badge.short_description = 'Status'
 
     def mark_as_delivered(self, request, queryset):
-        updated = queryset.update(status='Delivered', delivery_date=timezone.now().date())
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        # Stamped like Order.save() so kitchen tablets see them leave the queue
+        with transaction.atomic():
+            updated = queryset.update(
+                status='Delivered', delivery_date=timezone.now().date(), change_seq=next_order_change_seq()
+            )
+        for user_id in user_ids:
+            bump_version(f'orders:{user_id}')  # update() skips the signals
         self.message_user(request, f'{updated} orders marked as delivered')
     mark_as_delivered.short_description = "Mark selected as delivered"
 
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    # Maintained by core/rollup.py; rebuild with `manage.py rebuild_sales_rollup`
+    list_display = ('day', 'pickup_branch', 'status', 'scope', 'item', 'order_count', 'units', 'revenue')
+    list_filter = ('scope', 'status', 'pickup_branch')
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class JobAdmin(admin.ModelAdmin):
+    # Run by `manage.py run_jobs`; 'dead' jobs ran out of attempts
+    list_display = ('id', 'task', 'queue', 'status', 'attempts', 'run_at', 'locked_by', 'updated_at')
+    list_filter = ('status', 'queue', 'task')
+    search_fields = ('key',)
+    readonly_fields = ('last_error', 'locked_at', 'locked_by', 'created_at', 'updated_at')
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        updated = queryset.filter(status='dead')\
+            .update(status='queued', attempts=0, run_at=timezone.now(), locked_by='')
+        self.message_user(request, f'{updated} dead jobs re-queued.')
+    retry_jobs.short_description = "Re-queue selected dead jobs"
+
 admin.site.register(Item, ItemAdmin)
 admin.site.register(Reviews, ReviewsAdmin)
-admin.site.register(CartItems, CartItemsAdmin)
\ No newline at end of file
+admin.site.register(CartItems, CartItemsAdmin)
+admin.site.register(DailySalesRollup, DailySalesRollupAdmin)
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,41 @@
+"""
+Async DRF views.
+
+DRF's APIView.dispatch is synchronous. AsyncAPIView runs authentication,
+permissions and throttling in a worker thread (they may hit the database)
+and then awaits the coroutine handler, so under backend.asgi a request
+waiting on network I/O doesn't hold a thread. Handlers must be ``async
+def`` and wrap ORM calls in ``sync_to_async`` (or use the async ORM API).
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):  # OPTIONS is still sync
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,398 @@
+"""
+Endpoint performance regression suite.
+
+Seeds realistic volumes into the current database, then hits each hot
+endpoint through the API test client, recording the number of queries and
+p50/p95 latency against per-endpoint budgets, and checks that checkout
+runs the same queries whatever the cart size. It also records what the
+menu and order-history payloads cost to render and how many bytes each
+JSON renderer and compression encoding puts on the wire, and how many rows
+per second the serializers and the lean core.payloads read paths turn
+into response data. Run it through
+``python manage.py benchmark`` (which uses a throwaway test database);
+core.tests runs it at small volume to enforce the query budgets.
+"""
+import math
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import payloads
+from .compression import available_encodings
+from .models import Item, CartItems, Order, deferred_user_fields
+from .renderers import FastJSONRenderer, orjson_available
+from .rollup import rebuild as rebuild_sales_rollup
+
+
+User = get_user_model()
+
+BATCH_SIZE = 2000
+ORDER_HISTORY_DAYS = 60
+CART_LINES = 3  # lines in the benchmark customer's cart
+CHECKOUT_CART_SIZES = (1, 10, 100)  # cart lines for the checkout scaling run
+PAYLOAD_ORDERS = 100  # orders in the order-history payload measurement
+THROUGHPUT_ROWS = 1000  # page size for the serializer vs core.payloads comparison
+
+# Default seeded volumes
+DEFAULT_VOLUMES = {
+    'users': 1000,
+    'items': 2000,
+    'cart_items': 100000,
+    'orders': 50000,
+}
+
+# name -> (max queries, p50 budget ms, p95 budget ms)
+BUDGETS = {
+    'menu': (0, 25, 50),
+    'menu_uncached': (1, 1500, 2500),
+    'cart': (1, 50, 100),
+    'cart_summary': (1, 25, 50),
+    # Transaction statements, the order change counter (UPDATE + SELECT) and
+    # the on-commit sales rollup upkeep included
+    'order_create': (16, 150, 300),
+    'order_history': (2, 250, 500),
+    'admin_orders': (2, 100, 200),
+    'admin_dashboard': (3, 100, 200),
+    'sales_analytics': (1, 250, 500),
+    'user_profile': (0, 25, 50),
+}
+
+
+def seed(users, items, cart_items, orders):
+    """Bulk-load a realistic data set; returns the benchmark users"""
+    admin = User.objects.create_user(
+        username='bench-admin', email='bench-admin@example.com',
+        phone_number='+100000000', is_staff=True
+    )
+    customer = User.objects.create_user(
+        username='bench-customer', email='bench-customer@example.com',
+        phone_number='+100000001'
+    )
+
+    User.objects.bulk_create([
+        User(
+            username=f'bench-user-{i}',
+            email=f'bench-user-{i}@example.com',
+            phone_number=f'+2{i:09d}',
+        )
+        for i in range(users)
+    ], batch_size=BATCH_SIZE)
+    user_ids = [customer.id] + list(
+        User.objects.filter(username__startswith='bench-user-').values_list('id', flat=True)
+    )
+
+    categories = [choice for choice, _ in Item.CATEGORIES]
+    Item.objects.bulk_create([
+        Item(
+            title=f'Item {i}',
+            description='Seeded benchmark item',
+            category=categories[i % len(categories)],
+            price=Decimal(100 + i % 400) / 4,
+            image='images/burger.jpg',
+            slug=f'bench-item-{i}',
+            created_by=admin,
+        )
+        for i in range(items)
+    ], batch_size=BATCH_SIZE)
+    items = list(Item.objects.order_by('id').values('id', 'title', 'price', 'image'))
+    item_ids = [item['id'] for item in items]
+
+    # Orders, spread over the last ORDER_HISTORY_DAYS days
+    Order.objects.bulk_create([
+        Order(
+            user_id=user_ids[i % len(user_ids)],
+            pickup_branch='atlas1',
+            total_price=0,
+            status=Order.STATUS_CHOICES[i % len(Order.STATUS_CHOICES)][0],
+        )
+        for i in range(orders)
+    ], batch_size=BATCH_SIZE)
+    order_rows = list(Order.objects.order_by('id').values_list('id', 'user_id'))
+    if order_rows:
+        now = timezone.now()
+        per_day = math.ceil(len(order_rows) / ORDER_HISTORY_DAYS)
+        for day in range(ORDER_HISTORY_DAYS):
+            chunk = order_rows[day * per_day:(day + 1) * per_day]
+            if chunk:
+                Order.objects.filter(id__gte=chunk[0][0], id__lte=chunk[-1][0])\
+                    .update(created_at=now - timedelta(days=day))
+
+    # Cart lines: all of them attached to orders, round robin, with their snapshot
+    lines = []
+    for i in range(cart_items if order_rows else 0):
+        order_id, user_id = order_rows[i % len(order_rows)]
+        item = items[i % len(items)]
+        quantity = 1 + i % 3
+        lines.append(CartItems(
+            user_id=user_id,
+            item_id=item['id'],
+            quantity=quantity,
+            ordered=True,
+            order_id=order_id,
+            item_title=item['title'],
+            item_image=item['image'],
+            unit_price=item['price'],
+            line_total=quantity * item['price'],
+        ))
+    CartItems.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+    rebuild_sales_rollup()  # bulk_create skips the signals that maintain it
+
+    return {'admin': admin, 'customer': customer, 'item_ids': item_ids}
+
+
+def fill_cart(user, item_ids, lines=CART_LINES):
+    CartItems.objects.filter(user=user, ordered=False).delete()
+    CartItems.objects.bulk_create([
+        CartItems(user=user, item_id=item_id, quantity=2)
+        for item_id in item_ids[:lines]
+    ])
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def get_endpoints(fixtures):
+    admin, customer = fixtures['admin'], fixtures['customer']
+    refill = lambda: fill_cart(customer, fixtures['item_ids'])  # noqa: E731
+    return [
+        # name, method, url, user, data, setup (untimed, before every request)
+        ('menu', 'get', reverse('core:items-list'), None, None, None),
+        ('menu_uncached', 'get', reverse('core:items-list'), None, None, cache.clear),
+        ('cart', 'get', reverse('core:cart-list'), customer, None, None),
+        ('cart_summary', 'get', reverse('core:cart-summary'), customer, None, None),
+        ('order_create', 'post', reverse('core:order-create'), customer,
+            {'delivery_option': 'pickup', 'pickup_branch': 'atlas1'}, refill),
+        ('order_history', 'get', reverse('core:order-history'), customer, None, None),
+        ('admin_orders', 'get', reverse('core:admin-orders-list'), admin, None, None),
+        ('admin_dashboard', 'get', reverse('core:admin-dashboard'), admin, None, None),
+        ('sales_analytics', 'get', reverse('core:admin-sales-analytics'), admin, None, None),
+        ('user_profile', 'get', reverse('user-detail'), customer, None, None),
+    ]
+
+
+def measure(client, method, url, data, setup, repeat):
+    timings = []
+    queries = 0
+    status_code = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data, format='json')
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(ctx.captured_queries))
+        status_code = response.status_code
+    return status_code, queries, timings
+
+
+def checkout_scaling(fixtures, sizes=CHECKOUT_CART_SIZES, repeat=5):
+    """
+    Time order creation for growing carts. Passes if every cart size runs
+    the same number of queries (OrderService does no per-line work).
+    """
+    customer = fixtures['customer']
+    url = reverse('core:order-create')
+    data = {'delivery_option': 'pickup', 'pickup_branch': 'atlas1'}
+    client = APIClient()
+    client.force_authenticate(customer)
+
+    # The day's first order creates its sales rollup totals row (more
+    # queries than updating it), so check out the largest cart once first:
+    # every size then takes the same path
+    fill_cart(customer, fixtures['item_ids'], lines=max(sizes))
+    client.post(url, data, format='json')
+
+    results = []
+    for size in sizes:
+        refill = lambda: fill_cart(customer, fixtures['item_ids'], lines=size)  # noqa: E731
+        status_code, queries, timings = measure(client, 'post', url, data, refill, repeat)
+        results.append({
+            'cart_lines': min(size, len(fixtures['item_ids'])),
+            'status_code': status_code,
+            'queries': queries,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+        })
+    return {
+        'sizes': results,
+        'passed': all(result['status_code'] == 201 for result in results)
+        and len({result['queries'] for result in results}) == 1,
+    }
+
+
+def _timed(function, repeat):
+    """(median ms, last result) over ``repeat`` calls"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3), result
+
+
+def payload_encoding(repeat=5):
+    """
+    Serialize the full menu (ItemSerializer) and a page of orders with their
+    lines (OrderSerializer), then time each JSON renderer on them and each
+    compression encoding on the result, with the bytes each produces.
+    """
+    from .serializers import ItemSerializer, OrderSerializer
+
+    orders = Order.objects.select_related('user').defer(*deferred_user_fields('user'))\
+        .prefetch_related('cartitems_set').order_by('-created_at', '-id')
+    cases = [
+        ('menu', lambda: ItemSerializer(Item.objects.with_creator().order_by('id'), many=True).data),
+        ('order_history', lambda: OrderSerializer(orders[:PAYLOAD_ORDERS], many=True).data),
+    ]
+    renderers = [('stdlib', JSONRenderer())]
+    if orjson_available():
+        renderers.append(('orjson', FastJSONRenderer()))
+
+    results = []
+    for name, serialize in cases:
+        serialize_ms, data = _timed(serialize, repeat)
+        rendered = {}
+        renderer_results = []
+        for renderer_name, renderer in renderers:
+            ms, rendered[renderer_name] = _timed(lambda: renderer.render(data), repeat)
+            renderer_results.append({'renderer': renderer_name, 'ms': ms, 'bytes': len(rendered[renderer_name])})
+
+        body = rendered[renderers[-1][0]]
+        encoding_results = [{'encoding': 'identity', 'ms': 0.0, 'bytes': len(body)}]
+        for encoding, compress in available_encodings().items():
+            ms, compressed = _timed(lambda: compress(body), repeat)
+            encoding_results.append({'encoding': encoding, 'ms': ms, 'bytes': len(compressed)})
+
+        results.append({
+            'name': name,
+            'rows': len(data),
+            'serialize_ms': serialize_ms,
+            'renderers': renderer_results,
+            'encodings': encoding_results,
+        })
+    return results
+
+
+def serializer_throughput(rows=THROUGHPUT_ROWS, repeat=5):
+    """
+    Rows per second for a page of ``rows`` menu items, cart lines and orders,
+    through the DRF serializers and through core.payloads (query included
+    in both, since the lean path reads different columns)
+    """
+    from .serializers import ItemSerializer, CartItemSerializer, OrderSerializer
+
+    request = APIRequestFactory().get('/')
+    items = Item.objects.with_creator().order_by('id')
+    lines = CartItems.objects.filter(item__isnull=False)\
+        .select_related('user', 'item__created_by')\
+        .defer(*deferred_user_fields('user'), *deferred_user_fields('item__created_by'))\
+        .order_by('id')
+    orders = Order.objects.select_related('user').defer(*deferred_user_fields('user'))\
+        .prefetch_related('cartitems_set').order_by('-created_at', '-id')
+    context = {'request': request}
+    paths = [
+        ('menu',
+            lambda: ItemSerializer(items[:rows], many=True, context=context).data,
+            lambda: payloads.item_payloads(payloads.item_rows(items)[:rows], request)),
+        ('cart',
+            lambda: CartItemSerializer(lines[:rows], many=True, context=context).data,
+            lambda: payloads.cart_payloads(payloads.cart_rows(lines)[:rows], request)),
+        ('order_history',
+            lambda: OrderSerializer(orders[:rows], many=True, context=context).data,
+            lambda: payloads.order_payloads(payloads.order_rows(orders)[:rows], request)),
+    ]
+
+    results = []
+    for name, serializer_path, lean_path in paths:
+        serializer_ms, data = _timed(serializer_path, repeat)
+        lean_ms, _ = _timed(lean_path, repeat)
+        count = len(data)
+        results.append({
+            'name': name,
+            'rows': count,
+            'serializer_ms': serializer_ms,
+            'lean_ms': lean_ms,
+            'serializer_rows_per_s': round(count / serializer_ms * 1000) if serializer_ms else None,
+            'lean_rows_per_s': round(count / lean_ms * 1000) if lean_ms else None,
+            'speedup': round(serializer_ms / lean_ms, 2) if lean_ms else None,
+        })
+    return results
+
+
+def run_benchmark(users=None, items=None, cart_items=None, orders=None,
+                  repeat=20, check_latency=True):
+    """
+    Seed the database and measure every endpoint.
+    Returns a JSON-serializable report.
+    """
+    volumes = dict(DEFAULT_VOLUMES)
+    for name, value in (('users', users), ('items', items),
+                        ('cart_items', cart_items), ('orders', orders)):
+        if value is not None:
+            volumes[name] = value
+
+    cache.clear()
+    fixtures = seed(**volumes)
+    fill_cart(fixtures['customer'], fixtures['item_ids'])
+
+    client = APIClient()
+    results = []
+    for name, method, url, user, data, setup in get_endpoints(fixtures):
+        client.force_authenticate(user)
+        max_queries, p50_budget, p95_budget = BUDGETS[name]
+        # Warm-up request (fills caches, imports lazily loaded code)
+        if setup:
+            setup()
+        getattr(client, method)(url, data, format='json')
+
+        status_code, queries, timings = measure(client, method, url, data, setup, repeat)
+        p50, p95 = statistics.median(timings), percentile(timings, 0.95)
+
+        passed = status_code < 400 and queries <= max_queries
+        if check_latency:
+            passed = passed and p50 <= p50_budget and p95 <= p95_budget
+
+        results.append({
+            'name': name,
+            'method': method.upper(),
+            'url': url,
+            'status_code': status_code,
+            'queries': queries,
+            'max_queries': max_queries,
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(p95, 3),
+            'p50_budget_ms': p50_budget,
+            'p95_budget_ms': p95_budget,
+            'passed': passed,
+        })
+
+    scaling = checkout_scaling(fixtures, repeat=max(1, repeat // 4))
+    payload_results = payload_encoding(repeat=max(1, repeat // 4))
+    throughput = serializer_throughput(repeat=max(1, repeat // 4))
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'volumes': volumes,
+        'repeat': repeat,
+        'latency_checked': check_latency,
+        'endpoints': results,
+        'checkout_scaling': scaling,
+        'payloads': payload_results,
+        'serializer_throughput': throughput,
+        'passed': all(result['passed'] for result in results) and scaling['passed'],
+    }
@@ -0,0 +1,103 @@
+"""
+Menu catalog cache.
+
+Serialized menu payloads are stored in Django's cache framework, keyed on a
+catalog version. Any change to the menu (Item save/delete signals, admin bulk
+actions) bumps the version, so stale pages are simply never looked up again
+and expire on their own. Review count changes bump a second version,
+REVIEW_COUNTS, which the payload keys also include but the search index
+only uses to refresh its counts (see core/search.py).
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max, Min
+
+from .versioning import get_version, get_versions, bump_version, bump_version_on_commit
+
+
+CATALOG = 'menu-catalog'
+REVIEW_COUNTS = 'menu-review-counts'
+
+
+def _get_cache():
+    return caches[getattr(settings, 'MENU_CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _get_timeout():
+    return getattr(settings, 'MENU_CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+
+def get_catalog_version():
+    return get_version(CATALOG)
+
+
+def bump_catalog_version():
+    """Invalidate every cached menu payload"""
+    bump_version(CATALOG)
+
+
+def bump_catalog_version_on_commit():
+    bump_version_on_commit(CATALOG)
+
+
+def get_catalog_versions():
+    """(catalog version, review counts version)"""
+    versions = get_versions(CATALOG, REVIEW_COUNTS)
+    return versions[CATALOG], versions[REVIEW_COUNTS]
+
+
+def bump_review_counts_on_commit():
+    """Invalidate cached menu payloads for a change to Item.review_count only"""
+    bump_version_on_commit(REVIEW_COUNTS)
+
+
+def catalog_cache_key(request, version=None):
+    """Cache key for a menu page: full URL (page/filters/host) + catalog and review counts versions"""
+    if version is None:
+        version = '.'.join(map(str, get_catalog_versions()))
+    url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'{CATALOG}:{version}:{url_hash}'
+
+
+def get_cached_payload(key):
+    return _get_cache().get(key)
+
+
+def set_cached_payload(key, data):
+    _get_cache().set(key, data, _get_timeout())
+
+
+def compute_facets(queryset):
+    """
+    Item counts per category, label and size plus the price range, from one
+    GROUP BY over the three columns
+    """
+    facets = {'total': 0, 'category': {}, 'labels': {}, 'size': {}, 'price': {'min': None, 'max': None}}
+    groups = queryset.order_by().values('category', 'labels', 'size')\
+        .annotate(count=Count('id'), min_price=Min('price'), max_price=Max('price'))
+    price = facets['price']
+    for group in groups:
+        facets['total'] += group['count']
+        for field in ('category', 'labels', 'size'):
+            value = group[field] or ''
+            if value:
+                facets[field][value] = facets[field].get(value, 0) + group['count']
+        if price['min'] is None or group['min_price'] < price['min']:
+            price['min'] = group['min_price']
+        if price['max'] is None or group['max_price'] > price['max']:
+            price['max'] = group['max_price']
+    return facets
+
+
+def get_facets(queryset, params):
+    """Facets for the items matching ``params``, cached under the catalog version"""
+    params_hash = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    key = f'{CATALOG}:{get_catalog_version()}:facets:{params_hash}'
+    facets = get_cached_payload(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        set_cached_payload(key, facets)
+    return facets
@@ -0,0 +1,28 @@
+"""
+System checks for deployment settings the core app depends on.
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose data lives in (or never leaves) one process
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register('caches')
+def check_version_cache(app_configs, **kwargs):
+    """Version stamps in a per-process cache go stale across workers"""
+    if settings.DEBUG:
+        return []
+    alias = getattr(settings, 'VERSION_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [Error(
+        f"The '{alias}' cache ({backend}) is per process, so cache and ETag "
+        "versions would not be shared between workers.",
+        hint="Set CACHE_URL to a Redis server (or point VERSION_CACHE_ALIAS at a shared cache).",
+        id='core.E001',
+    )]
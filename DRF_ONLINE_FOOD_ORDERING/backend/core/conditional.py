@@ -0,0 +1,50 @@
+"""
+ETag / Last-Modified support for polled endpoints.
+
+Both values come from version counters (see versioning.py), so a
+conditional GET that matches returns 304 before any query or serialization
+runs.
+"""
+import hashlib
+
+from django.views.decorators.http import condition
+
+from .catalog import CATALOG, REVIEW_COUNTS
+from .versioning import get_versions, version_to_datetime
+
+
+# Version names each response depends on
+def menu_resources(request, **kwargs):
+    # Menu payloads embed each item's review count
+    return [CATALOG, REVIEW_COUNTS]
+
+
+def review_resources(request, **kwargs):
+    # Deleting an item also empties its review list, hence the catalog
+    return [CATALOG, f'reviews:{kwargs["slug"]}']
+
+
+def order_history_resources(request, **kwargs):
+    # Order lines are snapshots, so menu edits don't change the history
+    return [f'orders:{request.user.pk}']
+
+
+def versioned_condition(resources):
+    """
+    Build a ``condition`` decorator whose ETag and Last-Modified are derived
+    from the versions returned by ``resources(request, **kwargs)``.
+    """
+    def etag(request, *args, **kwargs):
+        versions = get_versions(*resources(request, **kwargs))
+        renderer = getattr(request, 'accepted_renderer', None)
+        parts = [
+            request.build_absolute_uri(),
+            renderer.format if renderer else '',
+        ] + [f'{name}={versions[name]}' for name in sorted(versions)]
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        versions = get_versions(*resources(request, **kwargs))
+        return version_to_datetime(max(versions.values()))
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,153 @@
+"""
+Order status push events.
+
+Every order creation or status change is published (on commit) to a
+broker; the SSE endpoint in core.streams subscribes async clients to it
+under backend.asgi, so customers and kitchen screens stop polling.
+
+Channels:
+    orders:user:<id>        one customer's orders
+    orders:staff            every order (admin order list / kitchen)
+
+The broker is pluggable through ORDER_EVENTS_BROKER (a dotted path to a
+Broker subclass). InProcessBroker only reaches subscribers in the process
+that made the change; run a shared broker (e.g. Redis pub/sub behind the
+same interface) when orders also change in other processes, such as
+``manage.py run_jobs`` workers.
+"""
+import asyncio
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+STAFF_CHANNEL = 'orders:staff'
+
+
+def user_channel(user_id):
+    return f'orders:user:{user_id}'
+
+
+class Broker:
+    """Interface for event backends"""
+
+    def publish(self, channel, event):
+        """Deliver ``event`` (a JSON-serializable dict) to the channel's subscribers; callable from any thread"""
+        raise NotImplementedError
+
+    def subscribe(self, channels):
+        """Return a Subscription to these channels; call from the consuming event loop"""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class Subscription:
+    """Events for one consumer, buffered on its event loop"""
+
+    def __init__(self, broker, channels, max_pending=100):
+        self.broker = broker
+        self.channels = list(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, event):
+        """Hand an event over from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # the consumer's loop has shut down
+
+    def _put(self, event):
+        if self.queue.full():
+            # A stalled client loses its oldest events rather than growing memory
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """The next event, or None after ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(Broker):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}  # channel -> set of Subscription
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+_event_ids = itertools.count(1)
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'ORDER_EVENTS_BROKER', 'core.events.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def reset_broker():
+    """Forget the broker, e.g. after changing ORDER_EVENTS_BROKER in tests"""
+    global _broker
+    _broker = None
+
+
+def order_event(order, previous_status=None):
+    return {
+        'id': f'{time.time_ns()}-{next(_event_ids)}',
+        'type': 'order.created' if previous_status is None else 'order.status',
+        'order_id': order.pk,
+        'user_id': order.user_id,
+        'status': order.status,
+        'previous_status': previous_status,
+        'delivery_option': order.delivery_option,
+        'pickup_branch': order.pickup_branch,
+    }
+
+
+def publish_order_event_on_commit(order, previous_status=None):
+    event = order_event(order, previous_status)
+
+    def publish():
+        broker = get_broker()
+        broker.publish(user_channel(order.user_id), event)
+        broker.publish(STAFF_CHANNEL, event)
+    transaction.on_commit(publish)
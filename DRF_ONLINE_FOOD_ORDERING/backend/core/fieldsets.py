@@ -0,0 +1,111 @@
+"""
+Sparse fieldsets: ``?fields=`` and ``?expand=``.
+
+Without ``?fields=`` responses are unchanged. ``?fields=id,title,price``
+returns only those top-level fields, in their usual order. Nested objects named in ``fields``
+(an item's ``created_by``, an order's ``customer`` and ``items``, a cart
+line's ``user`` and ``item``) collapse to their id, or list of ids, unless
+also named in ``?expand=``, which embeds them in full (and implies the
+field). So the mobile order list asks for
+``?fields=id,status,total_price,created_at`` and its detail screen for
+``?fields=id,status,total_price&expand=items``.
+
+Both renderings honour it: SparseFieldsMixin for the serializers,
+core.payloads for the lean list paths; and the views drop the joins and
+prefetches of fields that were not asked for.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class FieldSelection:
+
+    def __init__(self, fields=None, expand=()):
+        self.fields = None if fields is None else set(fields) | set(expand)
+        self.expand = set(expand)
+
+    @classmethod
+    def from_request(cls, request):
+        """The request's selection (parsed once); everything for no request"""
+        if request is None:
+            return ALL
+        selection = getattr(request, '_field_selection', None)
+        if selection is None:
+            params = getattr(request, 'query_params', None) or getattr(request, 'GET', {})
+            fields = params.get('fields')
+            selection = cls(_names(fields) if fields else None, _names(params.get('expand')))
+            request._field_selection = selection
+        return selection
+
+    @property
+    def sparse(self):
+        return self.fields is not None
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expanded(self, name):
+        """Whether a nested field is embedded in full (rather than as its id)"""
+        return self.fields is None or name in self.expand
+
+    def validate(self, available, expandable=()):
+        unknown = sorted(self.fields - set(available)) if self.fields is not None else []
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+        not_nested = sorted(self.expand - set(expandable))
+        if not_nested:
+            raise ValidationError({'expand': f"Cannot expand: {', '.join(not_nested)}"})
+
+
+ALL = FieldSelection()
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=`` / ``?expand=`` for a top-level serializer (and the child of
+    a top-level many=True one). Only the output is affected: input fields
+    and validation are unchanged.
+
+    ``collapsed_sources`` maps each nested field to the attribute holding
+    its id (or, for a list, the related manager whose ids are listed).
+    """
+    collapsed_sources = {}
+
+    @property
+    def field_selection(self):
+        parent = self.parent
+        if parent is not None and not (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return ALL  # nested: always rendered in full
+        return FieldSelection.from_request(self.context.get('request'))
+
+    @property
+    def _readable_fields(self):
+        selection = self.field_selection
+        if not selection.sparse and not selection.expand:
+            yield from super()._readable_fields
+            return
+        # Worked out once per serializer, not per row
+        fields = getattr(self, '_sparse_fields', None)
+        if fields is None:
+            readable = list(super()._readable_fields)
+            selection.validate([field.field_name for field in readable], self.collapsed_sources)
+            fields = self._sparse_fields = [
+                self._collapsed_field(field)
+                if field.field_name in self.collapsed_sources and not selection.expanded(field.field_name)
+                else field
+                for field in readable if selection.includes(field.field_name)
+            ]
+        yield from fields
+
+    def _collapsed_field(self, field):
+        source = self.collapsed_sources[field.field_name]
+        if isinstance(field, serializers.ListSerializer):
+            collapsed = serializers.PrimaryKeyRelatedField(many=True, read_only=True, source=source)
+        else:
+            collapsed = serializers.ReadOnlyField(source=source)
+        collapsed.bind(field.field_name, self)
+        return collapsed
@@ -0,0 +1,155 @@
+"""
+Idempotency-Key support for non-idempotent POST endpoints.
+
+The first request with a given key (per user) reserves it in the cache,
+runs, and stores its response for IDEMPOTENCY_KEY_TTL seconds. Retries
+with the same key and body get the stored response back without running
+the view again; a retry that arrives while the first is still running
+gets 409, and reusing a key with a different body gets 422. Server errors
+are not stored, so the client may retry them.
+"""
+import functools
+import hashlib
+import inspect
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+def _get_cache():
+    return caches[getattr(settings, 'IDEMPOTENCY_CACHE_ALIAS', 'default')]
+
+
+def _get_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+
+
+def _get_lock_timeout():
+    return getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+
+
+def _cache_key(request, key):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'idempotency:{request.user.pk}:{request.path}:{digest}'
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method}|{body}'.encode()).hexdigest()
+
+
+def _check(request):
+    """(cache key, fingerprint), or an error Response for a malformed key"""
+    key = request.headers.get(HEADER)
+    if key is None:
+        return None, None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {"error": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"},
+            status=status.HTTP_400_BAD_REQUEST
+        ), None
+    return _cache_key(request, key), _fingerprint(request)
+
+
+def _existing_response(entry, fingerprint):
+    if entry['fingerprint'] != fingerprint:
+        return Response(
+            {"error": f"{HEADER} was already used with a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if entry['state'] == PENDING:
+        return Response(
+            {"error": "A request with this Idempotency-Key is still being processed"},
+            status=status.HTTP_409_CONFLICT
+        )
+    response = Response(entry['data'], status=entry['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _completed(response, fingerprint):
+    """Cache entry for a finished response, or None if it should not be kept"""
+    if response.status_code >= 500:
+        return None
+    return {
+        'state': DONE,
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'data': response.data,
+    }
+
+
+def idempotent(method):
+    """
+    Decorate an APIView handler (sync or ``async def``) to honour the
+    Idempotency-Key request header. Requests without the header run as usual.
+    """
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, request, *args, **kwargs):
+            cache_key, fingerprint = _check(request)
+            if isinstance(cache_key, Response):
+                return cache_key
+            if cache_key is None:
+                return await method(self, request, *args, **kwargs)
+
+            cache = _get_cache()
+            pending = {'state': PENDING, 'fingerprint': fingerprint}
+            if not await cache.aadd(cache_key, pending, _get_lock_timeout()):
+                entry = await cache.aget(cache_key)
+                if entry is not None:
+                    return _existing_response(entry, fingerprint)
+                await cache.aset(cache_key, pending, _get_lock_timeout())
+
+            try:
+                response = await method(self, request, *args, **kwargs)
+            except BaseException:
+                await cache.adelete(cache_key)
+                raise
+            entry = _completed(response, fingerprint)
+            if entry is None:
+                await cache.adelete(cache_key)
+            else:
+                await cache.aset(cache_key, entry, _get_ttl())
+            return response
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        cache_key, fingerprint = _check(request)
+        if isinstance(cache_key, Response):
+            return cache_key
+        if cache_key is None:
+            return method(self, request, *args, **kwargs)
+
+        cache = _get_cache()
+        pending = {'state': PENDING, 'fingerprint': fingerprint}
+        if not cache.add(cache_key, pending, _get_lock_timeout()):
+            entry = cache.get(cache_key)
+            if entry is not None:
+                return _existing_response(entry, fingerprint)
+            # Expired between add() and get()
+            cache.set(cache_key, pending, _get_lock_timeout())
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except BaseException:
+            cache.delete(cache_key)
+            raise
+        entry = _completed(response, fingerprint)
+        if entry is None:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, entry, _get_ttl())
+        return response
+    return wrapper
@@ -0,0 +1,152 @@
+"""
+Menu image derivatives.
+
+When an item's image is uploaded (ItemSerializer, ItemAdmin) it is resized
+with Pillow to each width in ITEM_IMAGE_WIDTHS that the original can fill,
+in WebP and JPEG. Every file is named after a hash of its bytes, so it never
+changes under its URL and can be cached forever (see core/media.py).
+Item.image_variants records them:
+
+    {"source": "images/burger.jpg",
+     "webp": {"160": "images/variants/burger-160.3f2a9c1b7d4e.webp", ...},
+     "jpeg": {"160": "images/variants/burger-160.91c0d2e4a8b7.jpg", ...}}
+
+Variants an item no longer uses (its image was replaced or cleared, or the
+item deleted) are deleted once that change commits, unless another item
+was given the same upload.
+
+``python manage.py generate_image_variants`` backfills existing items.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'images/variants'
+
+# format -> (Pillow format, extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _widths():
+    return getattr(settings, 'ITEM_IMAGE_WIDTHS', (160, 320, 640, 1024))
+
+
+def _encode(image, pil_format, options):
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(image_field):
+    """Write the derivatives of an image file; returns the image_variants dict"""
+    from PIL import Image, ImageOps
+
+    image_field.open('rb')
+    try:
+        with Image.open(image_field) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'RGBA'):
+                original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+            source_width = original.width
+            widths = [width for width in _widths() if width <= source_width] or [source_width]
+
+            base = os.path.splitext(os.path.basename(image_field.name))[0]
+            variants = {'source': image_field.name}
+            for name, (pil_format, extension, options) in FORMATS.items():
+                variants[name] = {}
+                for width in widths:
+                    height = max(1, round(original.height * width / source_width))
+                    resized = original.resize((width, height), Image.Resampling.LANCZOS)
+                    if pil_format == 'JPEG' and resized.mode != 'RGB':
+                        resized = resized.convert('RGB')  # JPEG has no alpha
+                    data = _encode(resized, pil_format, options)
+                    digest = hashlib.sha256(data).hexdigest()[:12]
+                    path = f'{VARIANTS_DIR}/{base}-{width}.{digest}.{extension}'
+                    if not default_storage.exists(path):
+                        default_storage.save(path, ContentFile(data))
+                    variants[name][str(width)] = path
+    finally:
+        image_field.close()
+    return variants
+
+
+def ensure_variants(item):
+    """
+    (Re)build the item's derivatives if its image changed since they were
+    made. Failures are logged, not raised: the original image still works.
+    """
+    previous = item.image_variants
+    if not item.image:
+        if item.image_variants:
+            item.image_variants = {}
+            item.save(update_fields=['image_variants'])
+            delete_variants_on_commit(previous)
+        return
+    if item.image_variants.get('source') == item.image.name:
+        return
+    try:
+        item.image_variants = build_variants(item.image)
+    except Exception as e:
+        logger.error(f"Could not build image variants for item {item.pk}: {e}")
+        return
+    item.save(update_fields=['image_variants'])
+    delete_variants_on_commit(previous, keep=variant_paths(item.image_variants))
+
+
+def variant_paths(variants):
+    """Every file of an Item.image_variants dict"""
+    return {path for name in FORMATS for path in (variants.get(name) or {}).values()}
+
+
+def delete_variants(variants, keep=()):
+    """Delete the files of an image_variants dict no item uses any more"""
+    from .models import Item
+
+    source = variants.get('source')
+    if not source or Item.objects.filter(image_variants__source=source).exists():
+        return  # nothing built, or another item has the same upload
+    for path in variant_paths(variants) - set(keep):
+        try:
+            default_storage.delete(path)
+        except Exception as e:
+            logger.error(f"Could not delete image variant {path}: {e}")
+
+
+def delete_variants_on_commit(variants, keep=()):
+    if variants:
+        transaction.on_commit(lambda: delete_variants(variants, keep))
+
+
+def variant_urls(variants, request=None):
+    """{format: {width: url}} for an Item.image_variants dict"""
+    urls = {}
+    for name in FORMATS:
+        paths = variants.get(name) or {}
+        if paths:
+            urls[name] = {
+                width: request.build_absolute_uri(default_storage.url(path)) if request
+                else default_storage.url(path)
+                for width, path in paths.items()
+            }
+    return urls
+
+
+def srcset(urls):
+    """Turn {width: url} into an HTML srcset string"""
+    return ', '.join(f'{url} {width}w' for width, url in sorted(urls.items(), key=lambda pair: int(pair[0])))
+
+
+def srcsets(variants, request=None):
+    """{format: srcset string} for an Item.image_variants dict"""
+    return {name: srcset(widths) for name, widths in variant_urls(variants, request).items()}
@@ -0,0 +1,169 @@
+"""
+Database-backed background jobs.
+
+Views enqueue work as Job rows and return; ``python manage.py run_jobs``
+workers claim them (SELECT ... FOR UPDATE SKIP LOCKED where the database
+supports it, plus a status-guarded UPDATE so two workers never run the
+same job), retry failures with exponential backoff and move jobs that
+run out of attempts to the 'dead' status. Finished ('done') jobs are
+deleted once they are JOB_RETENTION old, by idle workers every
+JOB_PURGE_INTERVAL, so the table holds little more than pending work;
+dead jobs stay for inspection. Tasks are plain functions
+taking the job payload, registered by name:
+
+    @task('payments.process_payment')
+    def process_payment(payload):
+        ...
+
+    enqueue('payments.process_payment', {'tx_ref': tx_ref}, key=f'payment:{tx_ref}')
+"""
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a task when retrying cannot help; the job goes straight to dead"""
+
+
+def task(name):
+    """Register a function as the handler for jobs with this task name"""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, payload=None, key='', queue='default', run_at=None, max_attempts=None):
+    """
+    Add a job. With a key, returns the already queued or running job for
+    that key instead of adding a second one.
+    """
+    fields = {
+        'queue': queue,
+        'task': task_name,
+        'payload': payload or {},
+        'key': key,
+        'run_at': run_at or timezone.now(),
+        'max_attempts': max_attempts or settings.JOB_MAX_ATTEMPTS,
+    }
+    if not key:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(**fields)
+    except IntegrityError:
+        existing = Job.objects.filter(key=key, status__in=['queued', 'running']).first()
+        if existing is None:
+            # It finished in between
+            return Job.objects.create(**fields)
+        return existing
+
+
+def claim(worker, queue='default', limit=1):
+    """Lock up to ``limit`` due jobs for this worker and return them"""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    due = Job.objects.filter(queue=queue).filter(
+        Q(status='queued', run_at__lte=now)
+        # Claimed by a worker that died before finishing
+        | Q(status='running', locked_at__lt=stale)
+    )
+    with transaction.atomic():
+        candidates = list(
+            due.select_for_update(skip_locked=True)
+            .order_by('run_at', 'id')
+            .values_list('id', 'status', 'locked_at')[:limit]
+        )
+        claimed = []
+        for job_id, job_status, locked_at in candidates:
+            # Guarded on the state we read, for databases without row locks
+            if Job.objects.filter(id=job_id, status=job_status, locked_at=locked_at)\
+                    .update(status='running', locked_at=now, locked_by=worker):
+                claimed.append(job_id)
+    return list(Job.objects.filter(id__in=claimed).order_by('run_at', 'id'))
+
+
+def run(job):
+    """Run one claimed job and record the outcome; returns its new status"""
+    handler = _tasks.get(job.task)
+    try:
+        if handler is None:
+            raise PermanentJobError(f"Unknown task {job.task}")
+        handler(job.payload)
+    except Exception as e:
+        job.attempts += 1
+        job.last_error = traceback.format_exc()
+        if isinstance(e, PermanentJobError) or job.attempts >= job.max_attempts:
+            job.status = 'dead'
+            logger.error(f"Job {job} failed permanently: {e}")
+        else:
+            delay = settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.status = 'queued'
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning(f"Job {job} failed: {e}; retry {job.attempts}/{job.max_attempts} in {delay}s")
+    else:
+        job.attempts += 1
+        job.status = 'done'
+        job.last_error = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'attempts', 'run_at', 'locked_at', 'last_error', 'updated_at'])
+    return job.status
+
+
+def work(worker, queue='default', once=False, poll_interval=None, should_stop=None):
+    """
+    Claim and run jobs until ``should_stop()`` is true, or, with ``once``,
+    until the queue has nothing due. Returns the number of jobs run.
+    """
+    poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    processed = 0
+    last_purge = None
+    while not (should_stop and should_stop()):
+        if not connection.in_atomic_block:  # e.g. a test case's transaction
+            close_old_connections()
+        jobs = claim(worker, queue=queue, limit=settings.JOB_CLAIM_BATCH)
+        for job in jobs:
+            run(job)
+            processed += 1
+        if not jobs:
+            if last_purge is None or time.monotonic() - last_purge >= settings.JOB_PURGE_INTERVAL:
+                purge_finished()
+                last_purge = time.monotonic()
+            if once:
+                break
+            time.sleep(poll_interval)
+    return processed
+
+
+def purge_finished(older_than=None, batch_size=1000):
+    """Delete done jobs last updated more than ``older_than`` (JOB_RETENTION) ago"""
+    older_than = settings.JOB_RETENTION if older_than is None else older_than
+    finished = Job.objects.filter(status='done', updated_at__lt=timezone.now() - older_than)
+    deleted = 0
+    while True:
+        # In batches, so no single DELETE holds its locks for long
+        ids = list(finished.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Job.objects.filter(id__in=ids).delete()[0]
+
+
+def retry_dead(queue='default', task_name=None):
+    """Put dead-lettered jobs back on the queue with fresh attempts"""
+    jobs = Job.objects.filter(queue=queue, status='dead')
+    if task_name:
+        jobs = jobs.filter(task=task_name)
+    return jobs.update(status='queued', attempts=0, run_at=timezone.now(), locked_by='')
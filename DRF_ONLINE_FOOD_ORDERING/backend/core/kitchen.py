@@ -0,0 +1,79 @@
+"""
+Kitchen display queue.
+
+The queue for a branch is its pickup orders in QUEUE_STATUSES. Every
+Order.save() (and the admin's bulk "mark as delivered") stamps the order
+with the next change stamp (models.next_order_change_seq), so a tablet that
+remembers the token from its last response can ask for ``?since=<token>``
+and get back only the orders written after it: those still in the queue,
+plus the ids of those that have left it. Other queryset ``update()`` calls
+on Order do not stamp, and such changes are not in the feed.
+
+On PostgreSQL stamps come from a sequence and a write can commit after one
+stamped later, so deltas also re-send the KITCHEN_SYNC_LOOKBACK stamps
+before the token; tablets apply orders and removals by id, so a repeat is
+harmless.
+"""
+from django.conf import settings
+from django.db import connection
+
+from .models import CartItems, Order, current_order_change_seq
+
+
+QUEUE_STATUSES = ('Active', 'Processing')
+ORDER_FIELDS = ('id', 'status', 'delivery_option', 'pickup_time', 'created_at', 'total_price', 'change_seq')
+
+
+def _delta_floor(since):
+    if connection.vendor == 'postgresql':
+        return max(since - settings.KITCHEN_SYNC_LOOKBACK, 0)
+    # The counter row's lock makes stamps visible in order
+    return since
+
+
+def kitchen_queue(branch, since=None):
+    """
+    {'token', 'full', 'orders', 'removed'} for a branch; ``full`` is true
+    when ``orders`` is the whole queue rather than a delta.
+    """
+    # Read the token first: anything committed after this read is picked
+    # up by the next sync (at worst twice)
+    token = current_order_change_seq()
+
+    orders = Order.objects.filter(pickup_branch=branch)
+    removed = []
+    if since is None:
+        orders = list(
+            orders.filter(status__in=QUEUE_STATUSES)
+            .order_by('created_at', 'id')
+            .values(*ORDER_FIELDS)
+        )
+    else:
+        changed = orders.filter(change_seq__gt=_delta_floor(since)).order_by('created_at', 'id').values(*ORDER_FIELDS)
+        orders = []
+        for order in changed:
+            token = max(token, order['change_seq'])
+            if order['status'] in QUEUE_STATUSES:
+                orders.append(order)
+            else:
+                removed.append(order['id'])
+
+    lines = {}
+    if orders:
+        for line in CartItems.objects.filter(order_id__in=[order['id'] for order in orders])\
+                .order_by('id').values('order_id', 'item_title', 'quantity'):
+            lines.setdefault(line['order_id'], []).append(
+                {'title': line['item_title'], 'quantity': line['quantity']}
+            )
+    for order in orders:
+        order['lines'] = lines.get(order['id'], [])
+        # Under the counter row's lock every write stamped up to the newest
+        # one read here is visible too (on PostgreSQL, see _delta_floor)
+        token = max(token, order.pop('change_seq'))
+
+    return {
+        'token': str(token),
+        'full': since is None,
+        'orders': orders,
+        'removed': removed,
+    }
@@ -0,0 +1,85 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmark import DEFAULT_VOLUMES, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database with realistic volumes and check every hot "
+        "endpoint against its query-count and latency budgets"
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=default,
+                help=f'Number of {name.replace("_", " ")} to seed (default {default})'
+            )
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed requests per endpoint (default 20)')
+        parser.add_argument('--report', help='Write the JSON report to this file')
+        parser.add_argument('--no-latency-check', action='store_true',
+                            help='Only enforce query budgets (for noisy machines)')
+
+    def handle(self, *args, **options):
+        # Never seed into the real database
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            report = run_benchmark(
+                users=options['users'],
+                items=options['items'],
+                cart_items=options['cart_items'],
+                orders=options['orders'],
+                repeat=options['repeat'],
+                check_latency=not options['no_latency_check'],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for result in report['endpoints']:
+            style = self.style.SUCCESS if result['passed'] else self.style.ERROR
+            self.stdout.write(style(
+                f"{result['name']:<16} {result['queries']:>3}/{result['max_queries']:<3} queries  "
+                f"p50 {result['p50_ms']:>9.2f}ms/{result['p50_budget_ms']}  "
+                f"p95 {result['p95_ms']:>9.2f}ms/{result['p95_budget_ms']}"
+            ))
+
+        scaling = report['checkout_scaling']
+        style = self.style.SUCCESS if scaling['passed'] else self.style.ERROR
+        for result in scaling['sizes']:
+            self.stdout.write(style(
+                f"checkout x{result['cart_lines']:<6} {result['queries']:>3} queries      "
+                f"p50 {result['p50_ms']:>9.2f}ms     p95 {result['p95_ms']:>9.2f}ms"
+            ))
+
+        for payload in report['payloads']:
+            renderers = '  '.join(
+                f"{result['renderer']} {result['ms']:.2f}ms/{result['bytes']}B" for result in payload['renderers']
+            )
+            encodings = '  '.join(
+                f"{result['encoding']} {result['ms']:.2f}ms/{result['bytes']}B" for result in payload['encodings']
+            )
+            self.stdout.write(
+                f"{payload['name']:<16} {payload['rows']} rows, serialize {payload['serialize_ms']:.2f}ms  "
+                f"render: {renderers}  wire: {encodings}"
+            )
+
+        for result in report['serializer_throughput']:
+            self.stdout.write(
+                f"{result['name'] + ' rows':<16} {result['rows']} rows  "
+                f"serializer {result['serializer_ms']:.2f}ms ({result['serializer_rows_per_s']}/s)  "
+                f"lean {result['lean_ms']:.2f}ms ({result['lean_rows_per_s']}/s)  x{result['speedup']}"
+            )
+
+        if options['report']:
+            with open(options['report'], 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+
+        if not report['passed']:
+            raise CommandError('One or more endpoints exceeded their budget, or checkout cost grew with cart size')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.images import ensure_variants
+from core.models import Item
+
+
+class Command(BaseCommand):
+    help = "Build the resized WebP/JPEG copies of menu item images that are missing or out of date"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild every item, not just stale ones')
+
+    def handle(self, *args, **options):
+        built = 0
+        for item in Item.objects.exclude(image=''):
+            if options['force']:
+                item.image_variants = {}
+            before = item.image_variants.get('source')
+            ensure_variants(item)
+            if item.image_variants.get('source') != before:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f"Built image variants for {built} items"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from core.rollup import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollup used by the admin dashboard and sales analytics"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', type=parse_date,
+            help='Only rebuild days on or after this date (YYYY-MM-DD); default is everything'
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild(since=options['since'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollup: {rows} rows"))
@@ -0,0 +1,51 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (webhook processing, order finalization)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', default='default', help='Queue to take jobs from')
+        parser.add_argument('--workers', type=int, default=1, help='Worker threads in this process')
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is due')
+        parser.add_argument('--poll-interval', type=float, help='Seconds between polls of an empty queue')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if not options['once'] and threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+
+        counts = []
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+        def worker(index):
+            try:
+                counts.append(jobs.work(
+                    f"{prefix}:{index}",
+                    queue=options['queue'],
+                    once=options['once'],
+                    poll_interval=options['poll_interval'],
+                    should_stop=stop.is_set,
+                ))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(index,), daemon=True)
+            for index in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {sum(counts)} jobs"))
@@ -0,0 +1,184 @@
+"""
+Media file serving.
+
+``django.conf.urls.static.static()`` only works with DEBUG on and sends no
+caching headers. serve_media is meant for production:
+
+- ETag / Last-Modified, answering If-None-Match / If-Modified-Since with 304
+- single byte ranges (Range / If-Range), 206 or 416
+- ``Cache-Control: immutable`` for a year on content-hashed names (the image
+  variants written by core/images.py), MEDIA_MAX_AGE for everything else
+- a precompressed ``<file>.br`` / ``<file>.gz`` sibling, when one exists and
+  the client accepts that encoding (full responses only)
+- with MEDIA_SENDFILE = 'x-accel-redirect' (nginx) or 'x-sendfile'
+  (Apache/lighttpd), only the headers are produced here and the proxy sends
+  the file itself, so no worker time goes into the transfer
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+
+# <name>.<12+ hex digits>.<ext>, e.g. burger-320.3f2a9c1b7d4e.webp
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12,}\.[A-Za-z0-9]+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Content-Encoding -> file suffix, in order of preference
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+ARCHIVE_TYPES = {'gzip': 'application/gzip', 'br': 'application/x-brotli', 'bzip2': 'application/x-bzip', 'xz': 'application/x-xz'}
+CHUNK_SIZE = 64 * 1024
+
+
+def cache_control(path):
+    if HASHED_NAME_RE.search(path):
+        return f"public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={settings.MEDIA_MAX_AGE}"
+
+
+def _accepts(request, encoding):
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return any(
+        part.split(';')[0].strip() == encoding and not re.search(r';\s*q=0(\.0*)?$', part.strip())
+        for part in accepted.split(',')
+    )
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single byte range, None to ignore the header, or raise ValueError if unsatisfiable"""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None  # multiple or malformed ranges: send the whole file
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end or start >= size:
+            raise ValueError(header)
+    else:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        start, end = max(size - length, 0), size - 1
+    return start, end
+
+
+def _read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _sendfile_response(path, full_path):
+    response = HttpResponse()
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path
+    else:
+        response['X-Sendfile'] = full_path
+    # Let the proxy pick the Content-Type and handle ranges itself
+    del response['Content-Type']
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """GET/HEAD <MEDIA_URL><path> - a file under MEDIA_ROOT"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+    try:
+        stats = os.stat(full_path)
+    except OSError:
+        raise Http404("File not found")
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404("File not found")
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    if encoding:
+        # A compressed file asked for by name is sent as-is, like FileResponse does
+        content_type = ARCHIVE_TYPES.get(encoding, 'application/octet-stream')
+    served_path, content_encoding = full_path, None
+    range_header = request.META.get('HTTP_RANGE')
+    if not range_header and not encoding and not settings.MEDIA_SENDFILE:
+        for name, suffix in PRECOMPRESSED:
+            if os.path.isfile(full_path + suffix) and _accepts(request, name):
+                served_path, content_encoding = full_path + suffix, name
+                stats = os.stat(served_path)
+                break
+
+    size = stats.st_size
+    etag = f'"{stats.st_mtime_ns:x}-{size:x}' + (f'-{content_encoding}"' if content_encoding else '"')
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stats.st_mtime),
+        'Cache-Control': cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+
+    def finish(response):
+        for header, value in headers.items():
+            response.headers.setdefault(header, value)
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stats.st_mtime))
+    if not_modified is not None:
+        return finish(not_modified)
+
+    if settings.MEDIA_SENDFILE:
+        return finish(_sendfile_response(path, full_path))
+
+    byte_range = None
+    if range_header:
+        if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == int(stats.st_mtime):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return finish(response)
+
+    content_type = content_type or 'application/octet-stream'
+    if byte_range is None or byte_range == (0, size - 1):
+        response = FileResponse(
+            open(served_path, 'rb'), content_type=content_type, filename=os.path.basename(full_path)
+        )
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+        return finish(response)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(open(served_path, 'rb'), start, end - start + 1),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return finish(response)
+
+
+def media_urlpatterns():
+    """URL patterns serving MEDIA_URL from MEDIA_ROOT (none when MEDIA_URL is on another host)"""
+    prefix = settings.MEDIA_URL
+    if not prefix or '://' in prefix or prefix.startswith('//'):
+        return []
+    return [re_path(r'^%s(?P<path>.*)$' % re.escape(prefix.lstrip('/')), serve_media, name='media')]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:58
+
+from django.db import migrations, models
+
+
+def merge_duplicate_active_rows(apps, schema_editor):
+    """Fold duplicate open cart rows for the same item into the oldest one"""
+    CartItems = apps.get_model('core', 'CartItems')
+    duplicates = (
+        CartItems.objects.filter(ordered=False, item__isnull=False)
+        .values('user_id', 'item_id')
+        .annotate(rows=models.Count('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        rows = list(
+            CartItems.objects.filter(
+                ordered=False, user_id=duplicate['user_id'], item_id=duplicate['item_id']
+            ).order_by('id')
+        )
+        keep, extra = rows[0], rows[1:]
+        keep.quantity = sum(row.quantity for row in rows)
+        keep.save(update_fields=['quantity'])
+        CartItems.objects.filter(id__in=[row.id for row in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_order_latitude_order_longitude_order_pickup_branch'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_active_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitems',
+            constraint=models.UniqueConstraint(condition=models.Q(('ordered', False)), fields=('user', 'item'), name='unique_active_cart_item'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:59
+
+from django.db import migrations, models
+
+
+def snapshot_ordered_lines(apps, schema_editor):
+    """Backfill the snapshot on lines ordered before it existed (best effort: current menu values)"""
+    CartItems = apps.get_model('core', 'CartItems')
+    Item = apps.get_model('core', 'Item')
+    item = Item.objects.filter(pk=models.OuterRef('item_id'))
+    unit_price = models.Subquery(item.values('price')[:1])
+    CartItems.objects.filter(ordered=True, item__isnull=False).update(
+        item_title=models.Subquery(item.values('title')[:1]),
+        item_image=models.Subquery(item.values('image')[:1]),
+        unit_price=unit_price,
+        line_total=models.ExpressionWrapper(
+            models.F('quantity') * unit_price,
+            output_field=models.DecimalField(max_digits=10, decimal_places=2)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_cartitems_unique_active_cart_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitems',
+            name='item_image',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='cartitems',
+            name='item_title',
+            field=models.CharField(blank=True, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='cartitems',
+            name='line_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='cartitems',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.RunPython(snapshot_ordered_lines, migrations.RunPython.noop),
+    ]
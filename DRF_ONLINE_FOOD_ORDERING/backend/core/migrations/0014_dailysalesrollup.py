@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('pickup_branch', models.CharField(blank=True, default='', max_length=20)),
+                ('status', models.CharField(choices=[('Active', 'Active'), ('Processing', 'Processing'), ('Shipped', 'Shipped'), ('Delivered', 'Delivered'), ('Cancelled', 'Cancelled')], max_length=20)),
+                ('scope', models.CharField(choices=[('order', 'Order totals'), ('item', 'Per item')], max_length=10)),
+                ('order_count', models.IntegerField(default=0)),
+                ('line_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.item')),
+            ],
+            options={
+                'verbose_name': 'Daily Sales Rollup',
+                'verbose_name_plural': 'Daily Sales Rollups',
+                'indexes': [models.Index(fields=['scope', 'day'], name='rollup_scope_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('scope', 'order')), fields=('day', 'pickup_branch', 'status'), name='unique_order_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('item__isnull', False), ('scope', 'item')), fields=('day', 'pickup_branch', 'status', 'item'), name='unique_item_rollup'),
+        ),
+    ]
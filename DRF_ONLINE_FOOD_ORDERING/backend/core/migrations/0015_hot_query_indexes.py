@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitems',
+            index=models.Index(condition=models.Q(('ordered', False)), fields=['user', 'id'], name='cart_active_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_id_idx'),
+        ),
+    ]
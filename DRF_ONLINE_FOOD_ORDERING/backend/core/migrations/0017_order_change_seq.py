@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:20
+
+from django.db import migrations, models
+
+
+def create_counter(apps, schema_editor):
+    # Order.save() only increments it, so there is no create-on-miss race
+    OrderChangeCounter = apps.get_model('core', 'OrderChangeCounter')
+    OrderChangeCounter.objects.get_or_create(name='orders')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['pickup_branch', 'change_seq'], name='order_branch_change_seq_idx'),
+        ),
+        migrations.RunPython(create_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:40
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_reviews(apps, schema_editor):
+    Item = apps.get_model('core', 'Item')
+    Reviews = apps.get_model('core', 'Reviews')
+    counts = Reviews.objects.filter(item_id=models.OuterRef('pk'))\
+        .order_by().values('item_id').annotate(count=models.Count('id')).values('count')[:1]
+    Item.objects.update(review_count=Coalesce(models.Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_item_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='reviews',
+            index=models.Index(fields=['item', '-posted_on', '-id'], name='review_item_posted_idx'),
+        ),
+        migrations.RunPython(count_reviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:10
+
+from django.db import migrations
+
+SEQUENCE = 'core_order_change_seq'
+
+
+def create_sequence(apps, schema_editor):
+    # Order.change_seq comes from nextval() on PostgreSQL, carrying on from
+    # the counter row; other databases keep using the row
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    OrderChangeCounter = apps.get_model('core', 'OrderChangeCounter')
+    value = OrderChangeCounter.objects.filter(name='orders').values_list('value', flat=True).first() or 0
+    schema_editor.execute(f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE} START WITH {value + 1}')
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM {SEQUENCE}')
+        value = cursor.fetchone()[0]
+    OrderChangeCounter = apps.get_model('core', 'OrderChangeCounter')
+    OrderChangeCounter.objects.filter(name='orders').update(value=value)
+    schema_editor.execute(f'DROP SEQUENCE IF EXISTS {SEQUENCE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_item_review_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
@@ -1,5 +1,6 @@
 import uuid
-from django.db import models
+from decimal import Decimal
+from django.db import connection, models, transaction
 from django.shortcuts import reverse
 from django.utils import timezone
 from django.utils.text import slugify
@@ -11,6 +12,26 @@ from django.core.validators import FileExtensionValidator
 User = get_user_model()
 
 
+# User columns embedded in responses (core.serializers.UserSerializer)
+EMBEDDED_USER_FIELDS = ('id', 'username', 'email', 'score')
+
+
+def deferred_user_fields(relation):
+    """Lookups to defer() so a joined user only loads the embedded columns"""
+    return [
+        f'{relation}__{field.name}'
+        for field in User._meta.concrete_fields
+        if field.name not in EMBEDDED_USER_FIELDS
+    ]
+
+
+class ItemQuerySet(models.QuerySet):
+
+    def with_creator(self):
+        """Join the creator in the same query instead of one query per item"""
+        return self.select_related('created_by').defer(*deferred_user_fields('created_by'))
+
+
 # a model for the menu items
 class Item(models.Model):
 
@@ -52,10 +73,16 @@ class Item(models.Model):
     image = models.ImageField(upload_to='images/', 
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'webp'])],
         help_text="Upload images in JPG/PNG/WEBP format")
+    # Resized WebP/JPEG copies of image (core/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     labels = models.CharField(max_length=25, choices=LABELS, blank=True)
     label_colour = models.CharField(max_length=15, choices=LABEL_COLOUR, blank=True)
     slug = models.SlugField(unique=True, blank=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Maintained by the Reviews signals (core/reviews.py)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ItemQuerySet.as_manager()
 
 
     def __str__(self):
@@ -85,6 +112,10 @@ class Reviews(models.Model):
     class Meta:
         verbose_name = 'Review'
         verbose_name_plural = 'Reviews'
+        indexes = [
+            # An item's reviews, newest first (review list pages, summary)
+            models.Index(fields=['item', '-posted_on', '-id'], name='review_item_posted_idx'),
+        ]
 
     def __str__(self):
         return self.review
@@ -129,9 +160,42 @@ class Order(models.Model):
     admin_notes = models.TextField(blank=True, default='')  # Add this field
     cancel_reason = models.TextField(blank=True, default='')  # Add this field
     delivery_date = models.DateTimeField(null=True, blank=True, default=timezone.now)  # Add this field
+    # Stamped from OrderChangeCounter on every save (kitchen queue delta sync, core/kitchen.py)
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    # Status as loaded or last saved, so a status change can move the order
+    # between sales rollups (see core/rollup.py)
+    _rollup_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._rollup_status = instance.__dict__.get('status')
+        return instance
+
+    class Meta:
+        indexes = [
+            # Keyset pagination (core.pagination.OrderKeysetPagination)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_id_idx'),
+            # Admin order list filtered by status
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_id_idx'),
+            # Kitchen queue delta sync
+            models.Index(fields=['pickup_branch', 'change_seq'], name='order_branch_change_seq_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.get_delivery_option_display()}"
+
+    def save(self, *args, **kwargs):
+        # Every write moves the order past the kitchen tablets' sync tokens
+        with transaction.atomic(savepoint=False):
+            self.change_seq = next_order_change_seq()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+            super().save(*args, **kwargs)
+        # After the post_save handlers, which compare against it
+        self._rollup_status = self.status
     
     def clean(self):
         if not self.status:
@@ -143,6 +207,51 @@ class Order(models.Model):
                 })
 
 
+class CartItemsQuerySet(models.QuerySet):
+
+    def active_for(self, user):
+        """Rows in the user's open (not yet ordered) cart"""
+        return self.filter(user=user, ordered=False)
+
+    def summary(self):
+        """Line count, total quantity and subtotal in a single aggregate query"""
+        totals = self.aggregate(
+            line_count=models.Count('id'),
+            total_quantity=models.Sum('quantity'),
+            subtotal=models.Sum(
+                models.F('quantity') * models.F('item__price'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
+        return {
+            'line_count': totals['line_count'],
+            'total_quantity': totals['total_quantity'] or 0,
+            'subtotal': totals['subtotal'] or Decimal('0.00'),
+        }
+
+    def mark_ordered(self, order, **extra):
+        """
+        Attach the rows to an order and snapshot the item's title, price and
+        image onto each line, all in one UPDATE (correlated subqueries), so
+        order history never needs to read Item again.
+        """
+        item = Item.objects.filter(pk=models.OuterRef('item_id'))
+        unit_price = models.Subquery(item.values('price')[:1])
+        return self.update(
+            ordered=True,
+            order=order,
+            status='Active',
+            item_title=models.Subquery(item.values('title')[:1]),
+            item_image=models.Subquery(item.values('image')[:1]),
+            unit_price=unit_price,
+            line_total=models.ExpressionWrapper(
+                models.F('quantity') * unit_price,
+                output_field=models.DecimalField(max_digits=10, decimal_places=2)
+            ),
+            **extra
+        )
+
+
 # a model for the cart items
 class CartItems(models.Model):
     ORDER_STATUS = (
@@ -167,9 +276,35 @@ class CartItems(models.Model):
         blank=True
     )
 
+    # Snapshot of the item taken when the line is ordered (see mark_ordered),
+    # so order history keeps the price paid even if the menu changes later
+    item_title = models.CharField(max_length=150, blank=True)
+    item_image = models.CharField(max_length=100, blank=True)
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    line_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    objects = CartItemsQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Cart Item'
         verbose_name_plural = 'Cart Items'
+        indexes = [
+            # Open carts only: every cart call filters (user, ordered=False), and
+            # ordered history rows would otherwise dominate the user_id index
+            models.Index(
+                fields=['user', 'id'],
+                condition=models.Q(ordered=False),
+                name='cart_active_user_idx',
+            ),
+        ]
+        constraints = [
+            # One open cart row per item, so increments can be a single UPDATE
+            models.UniqueConstraint(
+                fields=['user', 'item'],
+                condition=models.Q(ordered=False),
+                name='unique_active_cart_item',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.quantity} x {self.item.title}"
@@ -181,3 +316,140 @@ class CartItems(models.Model):
     def total_price(self):
         return self.quantity * self.item.price
 
+
+
+# a model for the precomputed sales figures (maintained by core/rollup.py)
+class DailySalesRollup(models.Model):
+
+    SCOPES = (
+        ('order', 'Order totals'),
+        ('item', 'Per item'),
+    )
+
+    day = models.DateField()
+    pickup_branch = models.CharField(max_length=20, blank=True, default='')  # '' for delivery
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    scope = models.CharField(max_length=10, choices=SCOPES)
+    item = models.ForeignKey(Item, on_delete=models.SET_NULL, null=True, blank=True)
+
+    order_count = models.IntegerField(default=0)
+    line_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Daily Sales Rollup'
+        verbose_name_plural = 'Daily Sales Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'pickup_branch', 'status'],
+                condition=models.Q(scope='order'),
+                name='unique_order_rollup',
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'pickup_branch', 'status', 'item'],
+                condition=models.Q(scope='item', item__isnull=False),
+                name='unique_item_rollup',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['scope', 'day'], name='rollup_scope_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.pickup_branch or 'delivery'} {self.status} {self.scope}"
+
+
+# a model for the background job queue (run by core/jobs.py workers)
+class Job(models.Model):
+
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('dead', 'Dead'),  # out of attempts, kept for inspection
+    )
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=200, blank=True, default='')  # dedupe key for unfinished jobs
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status__in=['queued', 'running']) & ~models.Q(key=''),
+                name='unique_unfinished_job_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_at'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+
+# a model for monotonically increasing change sequences (see core/kitchen.py)
+class OrderChangeCounter(models.Model):
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def next_value(cls, name):
+        """
+        Increment and return the counter (its row is created by migration
+        0017). The UPDATE holds the row lock until the caller's transaction
+        commits, so values become visible in order.
+        """
+        with transaction.atomic(savepoint=False):
+            cls.objects.filter(name=name).update(value=models.F('value') + 1)
+            return cls.objects.filter(name=name).values_list('value', flat=True).get()
+
+    @classmethod
+    def current_value(cls, name):
+        return cls.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+# PostgreSQL sequence behind Order.change_seq (created by migration 0020)
+ORDER_CHANGE_SEQUENCE = 'core_order_change_seq'
+
+
+def next_order_change_seq():
+    """
+    The stamp for an order write. PostgreSQL hands it out from a sequence:
+    nextval() never waits on other writers, but stamps can then become
+    visible out of order (core/kitchen.py allows for that). Other databases
+    use the 'orders' OrderChangeCounter row, whose lock costs nothing extra
+    on SQLite, where writers take turns anyway.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT nextval(%s)', [ORDER_CHANGE_SEQUENCE])
+            return cursor.fetchone()[0]
+    return OrderChangeCounter.next_value('orders')
+
+
+def current_order_change_seq():
+    """The newest stamp handed out so far"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM {ORDER_CHANGE_SEQUENCE}'
+            )
+            return cursor.fetchone()[0]
+    return OrderChangeCounter.current_value('orders')
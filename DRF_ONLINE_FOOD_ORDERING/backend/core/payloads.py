@@ -0,0 +1,291 @@
+"""
+Lean read paths for the hot list endpoints.
+
+The menu list, cart list and order history build their responses here from
+``.values()`` rows with plain functions instead of running ItemSerializer,
+CartItemSerializer and OrderSerializer field by field. The output matches
+those serializers exactly (same keys, order and formatting), so they stay
+the single definition of the API for detail views and writes; the tests in
+core.tests compare both renderings.
+
+Each resource is a table of output fields, each naming the columns it
+reads and how it renders them. ``*_rows(queryset, selection)`` returns the
+values queryset to filter/paginate, reading only the columns (and joins) of
+the selected fields (see core.fieldsets), and ``*_payloads(rows, request,
+selection)`` turns a page of rows into response data.
+"""
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+
+from . import images
+from .fieldsets import ALL
+from .models import CartItems, Order
+
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"  # as in the serializers' DateTimeFields
+ORDER_LINE_VALUES = ('id', 'order_id', 'item_id', 'item_title', 'unit_price', 'quantity', 'status',
+                     'item_image', 'line_total')
+
+
+_quantums = {}
+
+
+def format_datetime(value):
+    """DateTimeField(format=DATETIME_FORMAT) representation"""
+    if not value:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.strftime(DATETIME_FORMAT)
+
+
+def format_decimal(value, decimal_places):
+    """DecimalField representation (a string, COERCE_DECIMAL_TO_STRING)"""
+    if value is None:
+        return None
+    quantum = _quantums.get(decimal_places)
+    if quantum is None:
+        quantum = _quantums[decimal_places] = Decimal(1).scaleb(-decimal_places)
+    return '{:f}'.format(value.quantize(quantum))
+
+
+def media_url(name, request):
+    """FileField/ImageField representation of a stored file name"""
+    if not name:
+        return None
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class Field:
+    """
+    An output key: the columns it reads (relative to the row's prefix) and
+    ``render(row, prefix, context)``. ``expandable`` fields have a collapsed
+    form, chosen by the resource's payload function.
+    """
+    __slots__ = ('columns', 'render', 'expandable')
+
+    def __init__(self, columns, render, expandable=False):
+        self.columns = columns
+        self.render = render
+        self.expandable = expandable
+
+
+class Nested:
+    """A related object embedded in full, or collapsed to ``id_column``"""
+    expandable = True
+
+    def __init__(self, relation, fields, id_column):
+        self.relation = relation
+        self.fields = fields
+        self.id_column = id_column
+        self._plan = None
+
+    @property
+    def plan(self):
+        """Every field, embedded objects in full"""
+        if self._plan is None:
+            self._plan = plan(self.fields)
+        return self._plan
+
+
+def value(column):
+    return Field((column,), lambda row, p, context: row[p + column])
+
+
+def datetime_value(column):
+    return Field((column,), lambda row, p, context: format_datetime(row[p + column]))
+
+
+def decimal_value(column, decimal_places):
+    return Field((column,), lambda row, p, context: format_decimal(row[p + column], decimal_places))
+
+
+def plan(fields, selection=ALL):
+    """[(name, field, expanded)] for the selected fields, in output order"""
+    selection.validate(fields, [name for name, field in fields.items() if field.expandable])
+    return [(name, field, selection.expanded(name)) for name, field in fields.items() if selection.includes(name)]
+
+
+def columns(field_plan, prefix=''):
+    names = []
+    for _, field, expanded in field_plan:
+        if isinstance(field, Nested):
+            if expanded:
+                names += columns(field.plan, f'{prefix}{field.relation}__')
+            else:
+                names.append(prefix + field.id_column)
+        else:
+            names += [prefix + column for column in field.columns]
+    return list(dict.fromkeys(names))
+
+
+def render(row, field_plan, context, prefix=''):
+    data = {}
+    for name, field, expanded in field_plan:
+        if isinstance(field, Nested):
+            if not expanded:
+                data[name] = row[prefix + field.id_column]
+                continue
+            nested_prefix = f'{prefix}{field.relation}__'
+            if row[nested_prefix + 'id'] is None:
+                data[name] = None
+            else:
+                data[name] = render(row, field.plan, context, nested_prefix)
+        else:
+            data[name] = field.render(row, prefix, context)
+    return data
+
+
+class Context:
+    """Per-response state shared by the render functions"""
+
+    def __init__(self, request):
+        self.request = request
+        self._item_url = None
+        self.lines = {}
+
+    def item_url(self, slug):
+        """Item.get_absolute_url without a reverse() per row"""
+        if self._item_url is None:
+            placeholder = 'item-slug'
+            self._item_url = reverse('core:items-detail', kwargs={'slug': placeholder}).rsplit(placeholder, 1)
+        prefix, suffix = self._item_url
+        return f'{prefix}{slug}{suffix}'
+
+
+# UserSerializer
+USER_FIELDS = {name: value(name) for name in ('id', 'username', 'email', 'score')}
+
+
+# Menu items (ItemSerializer)
+ITEM_FIELDS = {
+    'id': value('id'),
+    'title': value('title'),
+    'description': value('description'),
+    'category': value('category'),
+    'size': value('size'),
+    'price': value('price'),  # coerce_to_string=False
+    'image': Field(('image',), lambda row, p, context: media_url(row[p + 'image'], context.request)),
+    'image_srcset': Field(
+        ('image_variants',),
+        lambda row, p, context: images.srcsets(row[p + 'image_variants'] or {}, context.request)
+    ),
+    'labels': value('labels'),
+    'label_colour': value('label_colour'),
+    'slug': value('slug'),
+    'created_by': Nested('created_by', USER_FIELDS, 'created_by_id'),
+    'absolute_url': Field(('slug',), lambda row, p, context: context.item_url(row[p + 'slug'])),
+    'review_count': value('review_count'),
+}
+
+
+def item_rows(queryset, selection=ALL):
+    return queryset.prefetch_related(None).values(*columns(plan(ITEM_FIELDS, selection)))
+
+
+def item_payloads(rows, request, selection=ALL):
+    field_plan, context = plan(ITEM_FIELDS, selection), Context(request)
+    return [render(row, field_plan, context) for row in rows]
+
+
+# Cart (CartItemSerializer)
+def _line_total(row, p, context):
+    price = row[p + 'item__price']
+    return row[p + 'quantity'] * price if price is not None else None
+
+
+CART_FIELDS = {
+    'id': value('id'),
+    'user': Nested('user', USER_FIELDS, 'user_id'),
+    'item': Nested('item', ITEM_FIELDS, 'item_id'),
+    'ordered': value('ordered'),
+    'quantity': value('quantity'),
+    'ordered_date': datetime_value('ordered_date'),
+    'status': value('status'),
+    'delivery_date': datetime_value('delivery_date'),
+    'total_price': Field(('quantity', 'item__price'), _line_total),
+}
+
+
+def cart_rows(queryset, selection=ALL):
+    return queryset.prefetch_related(None).values(*columns(plan(CART_FIELDS, selection)))
+
+
+def cart_payloads(rows, request, selection=ALL):
+    field_plan, context = plan(CART_FIELDS, selection), Context(request)
+    return [render(row, field_plan, context) for row in rows]
+
+
+# Orders (OrderSerializer, with OrderItemSerializer lines)
+_delivery_options = dict(Order.DELIVERY_CHOICES)
+_branches = dict(Order.BRANCH_CHOICES)
+
+
+def _choice_display(column, choices):
+    # get_FOO_display(): the label, or the stored value if it has none
+    return Field((column,), lambda row, p, context: choices.get(row[p + column], row[p + column]))
+
+
+ORDER_FIELDS = {
+    'id': value('id'),
+    'customer': Nested('user', USER_FIELDS, 'user_id'),
+    'created_at': datetime_value('created_at'),
+    'status': value('status'),
+    'total_price': decimal_value('total_price', 2),
+    'delivery_option': value('delivery_option'),
+    'delivery_option_display': _choice_display('delivery_option', _delivery_options),
+    'pickup_branch': value('pickup_branch'),
+    'pickup_branch_display': _choice_display('pickup_branch', _branches),
+    'delivery_address': value('delivery_address'),
+    'latitude': decimal_value('latitude', 6),
+    'longitude': decimal_value('longitude', 6),
+    # Read by order_payloads in one query per page; line ids when collapsed
+    'items': Field(('id',), lambda row, p, context: context.lines.get(row[p + 'id'], []), expandable=True),
+    'delivery_date': datetime_value('delivery_date'),
+    'cancelled_at': datetime_value('cancelled_at'),
+    'pickup_time': datetime_value('pickup_time'),
+    'delivery_time': datetime_value('delivery_time'),
+}
+
+
+def order_rows(queryset, selection=ALL):
+    # id and created_at are always read: OrderKeysetPagination cursors need them
+    return queryset.prefetch_related(None).values(
+        *dict.fromkeys(['id', 'created_at', *columns(plan(ORDER_FIELDS, selection))])
+    )
+
+
+def order_line_payload(row, request):
+    title = row['item_title'] or '[Deleted Item]'
+    price = str(row['unit_price']) if row['unit_price'] is not None else '0.00'
+    return {
+        'id': row['id'],
+        'item': {'id': row['item_id'], 'title': title, 'price': price},
+        'item_id': row['item_id'],
+        'item_title': title,
+        'item_price': price,
+        'quantity': row['quantity'],
+        'status': row['status'],
+        'item_image': media_url(row['item_image'], request),
+        'line_total': format_decimal(row['line_total'], 2),
+    }
+
+
+def order_payloads(rows, request, selection=ALL):
+    """Payloads for a page of order rows; their lines, if wanted, are read in one query"""
+    rows = list(rows)
+    field_plan, context = plan(ORDER_FIELDS, selection), Context(request)
+    items = [expanded for name, _, expanded in field_plan if name == 'items']
+    if items and rows:
+        lines = CartItems.objects.filter(order_id__in=[row['id'] for row in rows]).order_by('order_id', 'id')
+        if items[0]:
+            for line in lines.values(*ORDER_LINE_VALUES):
+                context.lines.setdefault(line['order_id'], []).append(order_line_payload(line, request))
+        else:
+            for order_id, line_id in lines.values_list('order_id', 'id'):
+                context.lines.setdefault(order_id, []).append(line_id)
+    return [render(row, field_plan, context) for row in rows]
@@ -0,0 +1,53 @@
+"""
+API JSON rendering.
+
+FastJSONRenderer encodes with orjson (an optional dependency, several times
+faster than the stdlib on large lists) and falls back to DRF's
+JSONRenderer when it is not installed, when API_JSON_BACKEND = 'stdlib', or
+for indented (browsable/debug) output. Values orjson has no native form for
+(Decimal, dates, lazy strings, ...) go through DRF's encoder, so the output
+is the same whichever backend produced it.
+"""
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+_drf_encoder = JSONEncoder()
+
+
+def orjson_available():
+    return orjson is not None and getattr(settings, 'API_JSON_BACKEND', 'orjson') == 'orjson'
+
+
+def _default(obj):
+    return _drf_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if not orjson_available() or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_default,
+                # Dates go through DRF's encoder (millisecond precision, 'Z');
+                # None/int keys become strings like the stdlib does
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same as JSONRenderer: these are valid JSON but not valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,52 @@
+"""
+Item review counts and summaries.
+
+Item.review_count is kept in step by the Reviews signals with a single
+``UPDATE ... SET review_count = review_count + 1`` (or - 1) per review, so
+menu payloads carry each item's count without a COUNT query per item.
+review_summary() adds the newest reviews and is cached under the item's
+reviews version, which every review change bumps. A count change only
+invalidates the menu payloads (catalog.REVIEW_COUNTS), not the catalog
+version, so the search index is not rebuilt for it.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .catalog import bump_review_counts_on_commit
+from .models import Item, Reviews, deferred_user_fields
+from .versioning import get_version
+
+
+def item_reviews(**filters):
+    """Reviews with their author joined, newest first"""
+    return Reviews.objects.filter(**filters)\
+        .select_related('user')\
+        .defer(*deferred_user_fields('user'))\
+        .order_by('-posted_on', '-id')
+
+
+def adjust_review_count(item_id, delta):
+    Item.objects.filter(pk=item_id).update(review_count=Greatest(F('review_count') + delta, 0))
+    # Menu payloads embed the count
+    bump_review_counts_on_commit()
+
+
+def review_summary(slug):
+    """{'count', 'latest'} for an item, or None if there is no such item"""
+    from .serializers import ReviewSerializer
+
+    key = f'review-summary:{slug}:{get_version(f"reviews:{slug}")}'
+    summary = cache.get(key)
+    if summary is None:
+        item = Item.objects.filter(slug=slug).only('id', 'review_count').first()
+        if item is None:
+            return None
+        latest = item_reviews(item_id=item.id)[:settings.REVIEW_SUMMARY_LATEST]
+        summary = {
+            'count': item.review_count,
+            'latest': ReviewSerializer(latest, many=True).data,
+        }
+        cache.set(key, summary, settings.REVIEW_SUMMARY_CACHE_TIMEOUT)
+    return summary
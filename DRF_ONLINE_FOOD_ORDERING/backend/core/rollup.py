@@ -0,0 +1,162 @@
+"""
+Daily sales rollup maintenance.
+
+DailySalesRollup holds, per day / pickup branch / status, one 'order' row
+(order count, revenue) and one 'item' row per menu item (orders containing
+it, lines, units, revenue). Order signals keep it current incrementally;
+``python manage.py rebuild_sales_rollup`` recomputes it from scratch.
+"""
+from django.db import transaction, IntegrityError
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CartItems, DailySalesRollup, Order
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def snapshot_order(order):
+    """The figures an order contributes to the rollup"""
+    lines = CartItems.objects.filter(order_id=order.pk)\
+        .values('item_id')\
+        .annotate(lines=Count('id'), units=Sum('quantity'), revenue=Sum('line_total'))
+    return {
+        'day': timezone.localdate(order.created_at),
+        'pickup_branch': order.pickup_branch or '',
+        'total_price': order.total_price,
+        'lines': list(lines),
+    }
+
+
+def _bump(key, **deltas):
+    """Add deltas to one rollup row, creating it on first use"""
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    rows = DailySalesRollup.objects.filter(**key)
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            DailySalesRollup.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Another worker created it first
+        rows.update(**updates)
+
+
+def apply_snapshot(snapshot, status, sign):
+    """Add (sign=1) or remove (sign=-1) an order's figures under a status"""
+    key = {'day': snapshot['day'], 'pickup_branch': snapshot['pickup_branch'], 'status': status}
+    with transaction.atomic():
+        _bump(dict(key, scope='order'), order_count=sign, revenue=sign * snapshot['total_price'])
+        lines = [line for line in snapshot['lines'] if line['item_id'] is not None]
+        if lines:
+            _bump_items(key, lines, sign)
+        for line in snapshot['lines']:
+            if line['item_id'] is None:
+                # Lines of deleted items (not covered by unique_item_rollup)
+                _bump(dict(key, scope='item', item_id=None), order_count=sign, line_count=sign * line['lines'],
+                      units=sign * line['units'], revenue=sign * (line['revenue'] or 0))
+
+
+def _per_item(field, lines, amount, output_field):
+    """F(field) plus each line's amount, matched on item_id in one CASE"""
+    return F(field) + Case(
+        *[When(item_id=line['item_id'], then=Value(amount(line))) for line in lines],
+        default=Value(0),
+        output_field=output_field,
+    )
+
+
+def _bump_items(key, lines, sign):
+    """
+    Per-item rows for one order in two queries whatever its size: insert
+    the missing rows as zeros, then add every item's figures with one
+    UPDATE of F() expressions, so concurrent orders never lose an increment
+    """
+    DailySalesRollup.objects.bulk_create(
+        [DailySalesRollup(scope='item', item_id=line['item_id'], **key) for line in lines],
+        ignore_conflicts=True,
+    )
+    DailySalesRollup.objects.filter(scope='item', item_id__in=[line['item_id'] for line in lines], **key).update(
+        order_count=F('order_count') + sign,
+        line_count=_per_item('line_count', lines, lambda line: sign * line['lines'], IntegerField()),
+        units=_per_item('units', lines, lambda line: sign * line['units'], IntegerField()),
+        revenue=_per_item(
+            'revenue', lines, lambda line: sign * (line['revenue'] or 0),
+            DecimalField(max_digits=14, decimal_places=2),
+        ),
+    )
+
+
+def record_order(order, status):
+    """
+    Count a newly created order under the status it was created with (run
+    on commit, once its lines are attached; later status changes in the same
+    transaction move it on with move_order)
+    """
+    try:
+        apply_snapshot(snapshot_order(order), status, 1)
+    except Exception:
+        # The order itself is committed; don't fail the request over the rollup
+        logger.exception(f"Sales rollup not updated for order {order.pk}; run rebuild_sales_rollup")
+
+
+def move_order(order, old_status, new_status):
+    try:
+        snapshot = snapshot_order(order)
+        with transaction.atomic():
+            apply_snapshot(snapshot, old_status, -1)
+            apply_snapshot(snapshot, new_status, 1)
+    except Exception:
+        logger.exception(f"Sales rollup not updated for order {order.pk}; run rebuild_sales_rollup")
+
+
+@transaction.atomic
+def rebuild(since=None):
+    """Recompute the rollup (from `since`, a date, onwards) with grouped queries"""
+    orders = Order.objects.all()
+    lines = CartItems.objects.filter(ordered=True, order__isnull=False)
+    stale = DailySalesRollup.objects.all()
+    if since:
+        orders = orders.filter(created_at__date__gte=since)
+        lines = lines.filter(order__created_at__date__gte=since)
+        stale = stale.filter(day__gte=since)
+    stale.delete()
+
+    rows = [
+        DailySalesRollup(
+            day=row['day'],
+            pickup_branch=row['pickup_branch'] or '',
+            status=row['status'],
+            scope='order',
+            order_count=row['order_count'],
+            revenue=row['revenue'] or 0,
+        )
+        for row in orders.annotate(day=TruncDate('created_at'))
+            .values('day', 'pickup_branch', 'status')
+            .annotate(order_count=Count('id'), revenue=Sum('total_price'))
+    ]
+    rows += [
+        DailySalesRollup(
+            day=row['day'],
+            pickup_branch=row['order__pickup_branch'] or '',
+            status=row['order__status'],
+            scope='item',
+            item_id=row['item_id'],
+            order_count=row['order_count'],
+            line_count=row['line_count'],
+            units=row['units'] or 0,
+            revenue=row['revenue'] or 0,
+        )
+        for row in lines.annotate(day=TruncDate('order__created_at'))
+            .values('day', 'order__pickup_branch', 'order__status', 'item_id')
+            .annotate(
+                order_count=Count('order', distinct=True),
+                line_count=Count('id'),
+                units=Sum('quantity'),
+                revenue=Sum('line_total'),
+            )
+    ]
+    DailySalesRollup.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
@@ -0,0 +1,240 @@
+"""
+Menu search.
+
+MenuSearchIndex is an in-process inverted index over item title,
+description, category and labels. Every query word must match a word of
+the item, exactly, as a prefix (sorted vocabulary + bisect) or within one
+typo (deletion-neighbourhood lookup), and results are ranked by field
+weight and match quality. Item signals update the index on commit; a
+process that sees the menu catalog version move on without it (a change
+made by another worker) rebuilds it with one query on the next search.
+A review count change (catalog.REVIEW_COUNTS) only refreshes the counts.
+
+With MENU_SEARCH_BACKEND = 'postgres' (and a PostgreSQL database) searches
+go to the database's full-text engine instead.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .catalog import get_catalog_version, get_catalog_versions
+from .models import Item
+
+
+# Field weights in the ranking
+FIELD_WEIGHTS = {'title': 3.0, 'category': 2.0, 'labels': 2.0, 'description': 1.0}
+# How much each kind of match is worth, relative to an exact word
+EXACT, PREFIX, TYPO = 1.0, 0.7, 0.4
+MIN_TYPO_LENGTH = 4  # shorter words only match exactly or by prefix
+
+_word_re = re.compile(r'\w+')
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text or '').lower()
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _word_re.findall(text)
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _result(item):
+    return {
+        'id': item.id,
+        'title': item.title,
+        'slug': item.slug,
+        'category': item.category,
+        'labels': item.labels,
+        'price': item.price,
+        'image': item.image.url if item.image else None,
+        'review_count': item.review_count,
+    }
+
+
+class MenuSearchIndex:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self.review_counts_version = None
+        self._clear()
+
+    def _clear(self):
+        self.postings = {}  # word -> {item id: weight}
+        self.vocabulary = []  # sorted words, for prefix lookups
+        self.typos = {}  # word with one letter deleted -> words
+        self.items = {}  # item id -> result payload
+        self.words = {}  # item id -> words it was indexed under
+
+    def rebuild(self, version=None, review_counts_version=None):
+        items = Item.objects.only(
+            'id', 'title', 'slug', 'description', 'category', 'labels', 'price', 'image', 'review_count'
+        )
+        with self._lock:
+            self._clear()
+            for item in items:
+                self._add(item)
+            self.vocabulary = sorted(self.postings)
+            self.version = version
+            self.review_counts_version = review_counts_version
+
+    def refresh_review_counts(self, review_counts_version=None):
+        counts = Item.objects.values_list('id', 'review_count')
+        with self._lock:
+            for item_id, review_count in counts:
+                if item_id in self.items:
+                    self.items[item_id]['review_count'] = review_count
+            self.review_counts_version = review_counts_version
+
+    def update(self, item, version=None):
+        with self._lock:
+            self._remove(item.id)
+            self._add(item)
+            self.vocabulary = sorted(self.postings)
+            if version is not None:
+                self.version = version
+
+    def remove(self, item_id, version=None):
+        with self._lock:
+            self._remove(item_id)
+            self.vocabulary = sorted(self.postings)
+            if version is not None:
+                self.version = version
+
+    def _add(self, item):
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for word in tokenize(getattr(item, field)):
+                weights[word] = max(weights.get(word, 0), weight)
+        for word, weight in weights.items():
+            if word not in self.postings:
+                self.postings[word] = {}
+                for deleted in _deletes(word):
+                    self.typos.setdefault(deleted, set()).add(word)
+            self.postings[word][item.id] = weight
+        self.items[item.id] = _result(item)
+        self.words[item.id] = list(weights)
+
+    def _remove(self, item_id):
+        for word in self.words.pop(item_id, ()):
+            postings = self.postings[word]
+            postings.pop(item_id, None)
+            if not postings:
+                del self.postings[word]
+                for deleted in _deletes(word):
+                    self.typos[deleted].discard(word)
+                    if not self.typos[deleted]:
+                        del self.typos[deleted]
+        self.items.pop(item_id, None)
+
+    def _candidates(self, word):
+        """{indexed word: match quality} for one query word"""
+        matches = {}
+        start = bisect.bisect_left(self.vocabulary, word)
+        for candidate in self.vocabulary[start:]:
+            if not candidate.startswith(word):
+                break
+            matches[candidate] = EXACT if candidate == word else PREFIX
+        if len(word) >= MIN_TYPO_LENGTH:
+            # One substitution, insertion or deletion away
+            for variant in _deletes(word) | {word}:
+                for candidate in self.typos.get(variant, ()):
+                    matches.setdefault(candidate, TYPO)
+                if variant in self.postings:
+                    matches.setdefault(variant, TYPO)
+        return matches
+
+    def search(self, query, limit=20):
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            scores = None
+            for word in words:
+                word_scores = {}
+                for candidate, quality in self._candidates(word).items():
+                    for item_id, weight in self.postings[candidate].items():
+                        score = weight * quality
+                        if score > word_scores.get(item_id, 0):
+                            word_scores[item_id] = score
+                if scores is None:
+                    scores = word_scores
+                else:
+                    # Every query word has to match
+                    scores = {item_id: scores[item_id] + score
+                              for item_id, score in word_scores.items() if item_id in scores}
+                if not scores:
+                    return []
+            ranked = sorted(scores.items(), key=lambda pair: (-pair[1], self.items[pair[0]]['title']))
+            return [dict(self.items[item_id], score=round(score, 3)) for item_id, score in ranked[:limit]]
+
+
+_index = MenuSearchIndex()
+
+
+def update_index_on_commit(item, deleted=False):
+    """
+    Apply an item change to this process's index once it commits, if the
+    index was current before it (otherwise the next search rebuilds it)
+    """
+    version_before = get_catalog_version()
+    # Read now: a deleted instance's pk is None by the time this commits
+    item_id = item.pk
+
+    def apply():
+        if _index.version != version_before:
+            return
+        # The catalog version was bumped by an earlier on-commit callback
+        if deleted:
+            _index.remove(item_id, version=get_catalog_version())
+        else:
+            _index.update(item, version=get_catalog_version())
+    transaction.on_commit(apply)
+
+
+def get_index():
+    """The process-wide index, rebuilt if the menu changed elsewhere"""
+    version, review_counts_version = get_catalog_versions()
+    if _index.version != version:
+        _index.rebuild(version, review_counts_version)
+    elif _index.review_counts_version != review_counts_version:
+        _index.refresh_review_counts(review_counts_version)
+    return _index
+
+
+def use_postgres():
+    return getattr(settings, 'MENU_SEARCH_BACKEND', 'memory') == 'postgres' and connection.vendor == 'postgresql'
+
+
+def postgres_search(query, limit=20):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    words = tokenize(query)
+    if not words:
+        return []
+    vector = (
+        SearchVector('title', weight='A')
+        + SearchVector('category', 'labels', weight='B')
+        + SearchVector('description', weight='C')
+    )
+    # Prefix match on every word
+    search_query = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw')
+    items = Item.objects.annotate(document=vector, rank=SearchRank(vector, search_query))\
+        .filter(document=search_query).order_by('-rank', 'title')[:limit]
+    return [dict(_result(item), score=round(item.rank, 3)) for item in items]
+
+
+def search(query, limit=20, request=None):
+    results = postgres_search(query, limit) if use_postgres() else get_index().search(query, limit)
+    if request is not None:
+        # Absolute, like ItemSerializer's image (the index keeps the relative URL)
+        for result in results:
+            if result['image']:
+                result['image'] = request.build_absolute_uri(result['image'])
+    return results
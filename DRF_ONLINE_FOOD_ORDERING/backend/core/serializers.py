@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from .models import Item, Reviews, CartItems, Order
+from . import images
+from .fieldsets import SparseFieldsMixin
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.core.files.storage import default_storage
 
 
 #  Serializers for our models
@@ -15,24 +18,41 @@ class UserSerializer(serializers.ModelSerializer):
         ref_name = 'CoreUser'
 
 
-class ItemSerializer(serializers.ModelSerializer):
+class ItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    collapsed_sources = {'created_by': 'created_by_id'}
+
     absolute_url = serializers.SerializerMethodField()
     created_by = UserSerializer(read_only=True)
     price = serializers.DecimalField(max_digits=6, decimal_places=2, coerce_to_string=False)
     # `coerce_to_string=False`: Keep it as a **numeric value** in JSON instead of string (`19.99` not `"19.99"`)
     image = serializers.ImageField(required=False)
+    # {"webp": "<url> 160w, <url> 320w, ...", "jpeg": ...} for <img srcset>
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Item
         fields = [
             'id', 'title', 'description', 'category', 'size', 
-            'price', 'image', 'labels', 'label_colour', 'slug',
-            'created_by', 'absolute_url'
+            'price', 'image', 'image_srcset', 'labels', 'label_colour', 'slug',
+            'created_by', 'absolute_url', 'review_count'
         ]
-        read_only_fields = ['slug', 'created_by']
+        read_only_fields = ['slug', 'created_by', 'review_count']
     
     def get_absolute_url(self, obj):
         return obj.get_absolute_url()
+
+    def get_image_srcset(self, obj):
+        return images.srcsets(obj.image_variants, self.context.get('request'))
+
+    def create(self, validated_data):
+        item = super().create(validated_data)
+        images.ensure_variants(item)
+        return item
+
+    def update(self, instance, validated_data):
+        item = super().update(instance, validated_data)
+        images.ensure_variants(item)
+        return item
     
     # Added now
     def get_image(self, obj):
@@ -42,7 +62,9 @@ class ItemSerializer(serializers.ModelSerializer):
         return None
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    collapsed_sources = {'user': 'user_id'}
+
     user = UserSerializer(read_only=True)
     item = serializers.PrimaryKeyRelatedField(read_only=True)
     posted_on = serializers.DateTimeField(format="%Y-%m-%d %H:%M", read_only=True)
@@ -53,7 +75,9 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['rslug', 'posted_on', 'user', 'item']
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    collapsed_sources = {'user': 'user_id', 'item': 'item_id'}
+
     user = UserSerializer(read_only=True)
     item = ItemSerializer(read_only=True)
     item_id = serializers.PrimaryKeyRelatedField(
@@ -110,6 +134,36 @@ class CartItemSerializer(serializers.ModelSerializer):
     # }
 
 
+class CartBatchOperationSerializer(serializers.Serializer):
+    ACTIONS = (
+        ('add', 'Add quantity'),
+        ('set', 'Set quantity'),
+        ('remove', 'Remove from cart'),
+    )
+
+    action = serializers.ChoiceField(choices=ACTIONS, default='add')
+    slug = serializers.SlugField(required=False)
+    item_id = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(required=False, default=1, min_value=0)
+
+    def validate(self, data):
+        if ('slug' in data) == ('item_id' in data):
+            raise serializers.ValidationError("Provide exactly one of 'slug' or 'item_id'")
+        if data['action'] == 'add' and data['quantity'] < 1:
+            raise serializers.ValidationError({'quantity': "Quantity must be at least 1"})
+        return data
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartBatchOperationSerializer(many=True, allow_empty=False, max_length=100)
+
+
+class CartSummarySerializer(serializers.Serializer):
+    line_count = serializers.IntegerField()
+    total_quantity = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, coerce_to_string=False)
+
+
 class CartStatusUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItems
@@ -117,8 +171,12 @@ class CartStatusUpdateSerializer(serializers.ModelSerializer):
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    """
+    Order lines render from the snapshot taken at checkout
+    (CartItems.objects.mark_ordered), so no Item row is loaded.
+    """
     item = serializers.SerializerMethodField()
-    item_id = serializers.SerializerMethodField()
+    item_id = serializers.IntegerField(read_only=True)
     item_title = serializers.SerializerMethodField()
     item_price = serializers.SerializerMethodField()
     item_image = serializers.SerializerMethodField()
@@ -127,44 +185,38 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = CartItems
         fields = [
             'id', 'item', 'item_id', 'item_title', 'item_price',
-            'quantity', 'status', 'item_image'
+            'quantity', 'status', 'item_image', 'line_total'
         ]
 
     def get_item(self, obj):
-        if obj.item:
-            return {
-                'id': obj.item.id,
-                'title': obj.item.title,
-                'price': str(obj.item.price),
-            }
         return {
-            'id': None,
-            'title': '[Deleted Item]',
-            'price': '0.00'
+            'id': obj.item_id,
+            'title': self.get_item_title(obj),
+            'price': self.get_item_price(obj),
         }
 
-    def get_item_id(self, obj):
-        return obj.item.id if obj.item else None
-
     def get_item_title(self, obj):
-        return obj.item.title if obj.item else '[Deleted Item]'
+        return obj.item_title or '[Deleted Item]'
 
     def get_item_price(self, obj):
-        return str(obj.item.price) if obj.item else '0.00'
+        return str(obj.unit_price) if obj.unit_price is not None else '0.00'
 
     def get_item_image(self, obj):
-        if not obj.item or not obj.item.image:
+        if not obj.item_image:
             return None
+        url = default_storage.url(obj.item_image)
         request = self.context.get('request')
         if request:
-            return request.build_absolute_uri(obj.item.image.url)
-        return obj.item.image.url
+            return request.build_absolute_uri(url)
+        return url
 
 
 
 # In your core/serializers.py
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    collapsed_sources = {'customer': 'user_id', 'items': 'cartitems_set'}
+
     items = OrderItemSerializer(many=True, source='cartitems_set')
     customer = UserSerializer(source='user', read_only=True)
     status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
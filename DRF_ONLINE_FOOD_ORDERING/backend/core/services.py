@@ -0,0 +1,96 @@
+"""
+Order creation.
+
+OrderService is the one place an open cart becomes an order, used by
+OrderCreateView and by the payment worker (payments/tasks.py). Its cost
+does not depend on the number of cart lines: the rows are locked by id,
+the total is one aggregate, the lines are flipped (and snapshotted) by one
+UPDATE and the loyalty score is bumped with an F() expression.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .catalog import bump_catalog_version_on_commit
+from .models import CartItems, Order
+
+
+User = get_user_model()
+
+
+class OrderError(ValueError):
+    """The cart or checkout details cannot make an order"""
+
+
+class OrderService:
+
+    def __init__(self, user):
+        self.user = user
+
+    @staticmethod
+    def checkout_fields(data):
+        """Validate checkout details; returns the Order fields they set"""
+        delivery_option = data.get('delivery_option', 'pickup')
+        delivery_time = data.get('delivery_time')
+        pickup_time = data.get('pickup_time')
+        delivery_address = data.get('delivery_address', '')
+        latitude = data.get('latitude')
+        longitude = data.get('longitude')
+        pickup_branch = data.get('pickup_branch')
+
+        # Set default times if not provided
+        now = timezone.now()
+        if delivery_option == 'pickup' and not pickup_time:
+            pickup_time = now
+        elif delivery_option == 'delivery' and not delivery_time:
+            delivery_time = now
+
+        # Validate delivery option specific requirements
+        if delivery_option == 'delivery' and not delivery_address and not (latitude and longitude):
+            raise OrderError("Either delivery address or location coordinates are required for delivery")
+
+        if delivery_option == 'pickup' and not pickup_branch:
+            raise OrderError("Pickup branch is required for pickup orders")
+
+        is_delivery = delivery_option == 'delivery'
+        return {
+            'delivery_option': delivery_option,
+            'pickup_time': pickup_time,
+            'delivery_time': delivery_time,
+            'delivery_address': delivery_address if is_delivery else None,
+            'latitude': latitude if is_delivery else None,
+            'longitude': longitude if is_delivery else None,
+            'pickup_branch': pickup_branch if not is_delivery else None,
+        }
+
+    @transaction.atomic
+    def create_from_cart(self, data):
+        """
+        Turn the user's open cart into an order. Raises OrderError if the
+        cart is empty or the checkout details are invalid.
+        """
+        # Lock the cart items to prevent concurrent modifications
+        cart_items = CartItems.objects.active_for(self.user)
+        locked_ids = list(cart_items.select_for_update().values_list('id', flat=True))
+        if not locked_ids:
+            raise OrderError("Your cart is empty")
+
+        # Only the rows we locked, even if the cart grows meanwhile
+        lines = CartItems.objects.filter(id__in=locked_ids)
+        order = Order.objects.create(
+            user=self.user,
+            total_price=lines.summary()['subtotal'],
+            **self.checkout_fields(data)
+        )
+
+        # Snapshot item title/price/image onto the lines
+        lines.mark_ordered(order)
+
+        # Increment loyalty score without a read-modify-write of the user row
+        User.objects.filter(pk=self.user.pk).update(score=F('score') + 1)
+        self.user.score += 1  # keep the in-memory user (serialized with the order) in step
+        if self.user.is_staff:
+            # Bypasses post_save; staff are embedded (with their score) in the menu
+            bump_catalog_version_on_commit()
+        return order
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from . import images, reviews, rollup, search
+from .events import publish_order_event_on_commit
+from .catalog import bump_catalog_version_on_commit
+from .models import Item, Reviews, Order, CartItems
+from .versioning import bump_version_on_commit
+
+
+User = get_user_model()
+
+
+# Any menu change invalidates the cached catalog pages
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_menu_catalog(sender, instance, **kwargs):
+    bump_catalog_version_on_commit()
+
+
+# Keep this process's menu search index current (core/search.py). Registered
+# after invalidate_menu_catalog, whose version bump must run first on commit
+@receiver(post_save, sender=Item)
+def update_menu_search_index(sender, instance, **kwargs):
+    search.update_index_on_commit(instance)
+
+
+@receiver(post_delete, sender=Item)
+def remove_from_menu_search_index(sender, instance, **kwargs):
+    search.update_index_on_commit(instance, deleted=True)
+
+
+# Derived image files (core/images.py) go with the item
+@receiver(post_delete, sender=Item)
+def delete_image_variants(sender, instance, **kwargs):
+    images.delete_variants_on_commit(instance.image_variants)
+
+
+# Items embed their creator (an admin), so staff profile edits invalidate too
+@receiver(post_save, sender=User)
+def invalidate_menu_catalog_on_staff_change(sender, instance, **kwargs):
+    if instance.is_staff:
+        bump_catalog_version_on_commit()
+
+
+@receiver(post_save, sender=Reviews)
+@receiver(post_delete, sender=Reviews)
+def invalidate_item_reviews(sender, instance, **kwargs):
+    bump_version_on_commit(f'reviews:{instance.rslug}')
+
+
+# Denormalized Item.review_count (core/reviews.py)
+@receiver(post_save, sender=Reviews)
+def count_review(sender, instance, created, **kwargs):
+    if created and instance.item_id:
+        reviews.adjust_review_count(instance.item_id, 1)
+
+
+@receiver(post_delete, sender=Reviews)
+def uncount_review(sender, instance, **kwargs):
+    if instance.item_id:
+        reviews.adjust_review_count(instance.item_id, -1)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_order_history(sender, instance, **kwargs):
+    bump_version_on_commit(f'orders:{instance.user_id}')
+
+
+@receiver(post_save, sender=CartItems)
+@receiver(post_delete, sender=CartItems)
+def invalidate_order_history_lines(sender, instance, **kwargs):
+    if instance.order_id:
+        bump_version_on_commit(f'orders:{instance.user_id}')
+
+
+# Push order creation and status changes to SSE subscribers (core/events.py).
+# Order.save() resets _rollup_status after these handlers have run
+@receiver(post_save, sender=Order)
+def publish_order_status(sender, instance, created, **kwargs):
+    if created:
+        publish_order_event_on_commit(instance)
+    elif instance.status != instance._rollup_status:
+        publish_order_event_on_commit(instance, previous_status=instance._rollup_status)
+
+
+# Keep the daily sales rollup in step with orders. Work runs on commit, when
+# the order's lines have been attached (OrderCreateView marks them after
+# creating the order)
+@receiver(post_save, sender=Order)
+def maintain_sales_rollup(sender, instance, created, **kwargs):
+    if created:
+        status = instance.status
+        transaction.on_commit(lambda: rollup.record_order(instance, status))
+    elif instance.status != instance._rollup_status:
+        old_status, new_status = instance._rollup_status, instance.status
+        transaction.on_commit(lambda: rollup.move_order(instance, old_status, new_status))
+
+
+@receiver(pre_delete, sender=Order)
+def remove_from_sales_rollup(sender, instance, **kwargs):
+    # Snapshot now: the lines are deleted along with the order
+    snapshot = rollup.snapshot_order(instance)
+    status = instance._rollup_status
+    transaction.on_commit(lambda: rollup.apply_snapshot(snapshot, status, -1))
@@ -0,0 +1,75 @@
+"""
+Server-sent event stream of order changes (see core/events.py).
+
+Needs backend.asgi: under WSGI a stream would hold a worker thread for its
+whole life. Browsers' EventSource cannot send an Authorization header, so
+the JWT access token may also be passed as ``?token=``.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .events import STAFF_CHANNEL, get_broker, user_channel
+
+
+def _authenticate(request):
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    if isinstance(raw_token, str):
+        raw_token = raw_token.encode()
+    return auth.get_user(auth.get_validated_token(raw_token))
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(subscription, heartbeat, branch=None):
+    try:
+        yield f"retry: {settings.ORDER_EVENTS_RETRY_MS}\n\n"
+        while True:
+            event = await subscription.get(timeout=heartbeat)
+            if event is None:
+                # Keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+            elif branch is None or event['pickup_branch'] == branch:
+                yield format_event(event)
+    finally:
+        subscription.close()
+
+
+async def order_events(request):
+    """
+    GET orders/events/ - stream of order.created / order.status events:
+    the user's own orders, or every order for staff (``?branch=atlas1``
+    narrows that to one pickup branch).
+    """
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({"detail": str(e.detail)}, status=401)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    branch = None
+    if user.is_staff:
+        channels = [STAFF_CHANNEL]
+        branch = request.GET.get('branch') or None
+    else:
+        channels = [user_channel(user.pk)]
+
+    subscription = get_broker().subscribe(channels)
+    response = StreamingHttpResponse(
+        event_stream(subscription, settings.ORDER_EVENTS_HEARTBEAT, branch),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
@@ -1,3 +1,1454 @@
-from django.test import TestCase
+import gzip
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, IntegrityError
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .models import Item, Reviews, CartItems, Order, DailySalesRollup, Job
+from . import events, images, jobs, payloads, search
+from . import rollup
+from . import catalog
+from .checks import check_version_cache
+from .services import OrderService, OrderError
+from .benchmark import run_benchmark, seed
+from .compression import choose_encoding
+from .renderers import FastJSONRenderer
+from .streams import event_stream
+from .serializers import ItemSerializer, CartItemSerializer, OrderSerializer
+from .views import active_cart_items, OrderHistoryView, AdminOrderViewSet, ReviewListCreateView
+from payments.models import PaymentTransaction
+
+
+User = get_user_model()
+_phone_numbers = itertools.count(251900000000)
+
+
+def make_user(username, **extra):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        phone_number=f'+{next(_phone_numbers)}',
+        **extra
+    )
+
+
+def make_item(user, title='Burger', price='5.00', **extra):
+    return Item.objects.create(
+        title=title,
+        price=Decimal(price),
+        image='images/burger.jpg',
+        created_by=user,
+        **extra
+    )
+
+
+class MenuCatalogCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.item = make_item(self.admin)
+        self.url = reverse('core:items-list')
+
+    def test_second_read_is_served_without_queries(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_item_save_invalidates_catalog(self):
+        self.client.get(self.url)
+        self.item.title = 'Double Burger'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data[0]['title'], 'Double Burger')
+
+    def test_bump_changes_version(self):
+        version = catalog.get_catalog_version()
+        catalog.bump_catalog_version()
+        self.assertNotEqual(catalog.get_catalog_version(), version)
+
+
+class ConditionalResponseTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.item = make_item(self.admin)
+
+    def assertNotModifiedWithoutQueries(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('Last-Modified'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_menu_list_not_modified(self):
+        self.assertNotModifiedWithoutQueries(reverse('core:items-list'))
+
+    def test_reviews_not_modified(self):
+        self.assertNotModifiedWithoutQueries(
+            reverse('core:review-list', kwargs={'slug': self.item.slug})
+        )
+
+    def test_new_review_changes_etag(self):
+        url = reverse('core:review-list', kwargs={'slug': self.item.slug})
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Reviews.objects.create(
+                user=self.customer, item=self.item, rslug=self.item.slug, review='Great'
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_order_history_etag_is_per_user(self):
+        url = reverse('core:order-history')
+        self.client.force_authenticate(self.customer)
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(self.admin)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_menu_edit_keeps_order_history_etag(self):
+        url = reverse('core:order-history')
+        self.client.force_authenticate(self.customer)
+        etag = self.client.get(url)['ETag']
+        catalog.bump_catalog_version()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class VersionCacheCheckTests(SimpleTestCase):
+
+    @override_settings(DEBUG=False)
+    def test_per_process_cache_is_an_error_in_production(self):
+        self.assertEqual([error.id for error in check_version_cache(None)], ['core.E001'])
+
+    @override_settings(DEBUG=False, CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0',
+    }})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_version_cache(None), [])
+
+
+class ListEndpointQueryCountTests(TestCase):
+    """
+    Every list endpoint in core.urls must run a fixed number of queries,
+    however many rows it returns.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.item = make_item(self.admin)
+
+    def seed(self, count):
+        for _ in range(count):
+            item = make_item(make_user(f'chef-{Item.objects.count()}', is_staff=True))
+            reviewer = make_user(f'reviewer-{Reviews.objects.count()}')
+            Reviews.objects.create(
+                user=reviewer, item=self.item, rslug=self.item.slug, review='Tasty'
+            )
+            CartItems.objects.create(user=self.customer, item=item)
+            order = Order.objects.create(user=self.customer, total_price=item.price)
+            CartItems.objects.create(
+                user=self.customer, item=item, ordered=True, order=order
+            )
+
+    def count_queries(self, url):
+        cache.clear()  # measure the database path, not the menu cache
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, user):
+        self.client.force_authenticate(user)
+        self.seed(2)
+        small = self.count_queries(url)
+        self.seed(8)
+        self.assertEqual(self.count_queries(url), small, url)
+
+    def test_menu_list(self):
+        self.assertConstantQueries(reverse('core:items-list'), None)
+
+    def test_review_list(self):
+        self.assertConstantQueries(
+            reverse('core:review-list', kwargs={'slug': self.item.slug}), None
+        )
+
+    def test_cart_list(self):
+        self.assertConstantQueries(reverse('core:cart-list'), self.customer)
+
+    def test_order_history(self):
+        self.assertConstantQueries(reverse('core:order-history'), self.customer)
+
+    def test_admin_order_list(self):
+        self.assertConstantQueries(reverse('core:admin-orders-list'), self.admin)
+
+    def test_admin_dashboard(self):
+        self.assertConstantQueries(reverse('core:admin-dashboard'), self.admin)
+
+    def test_admin_popular_items(self):
+        self.assertConstantQueries(reverse('core:admin-popular-items'), self.admin)
+
+    def test_admin_sales_analytics(self):
+        self.assertConstantQueries(reverse('core:admin-sales-analytics'), self.admin)
+
+
+class EndpointBudgetTests(TestCase):
+    """Small-volume run of core.benchmark; latency is only checked by the command"""
+
+    def test_query_budgets(self):
+        report = run_benchmark(
+            users=10, items=20, cart_items=200, orders=100,
+            repeat=2, check_latency=False
+        )
+        failures = [
+            f"{result['name']}: {result['queries']}/{result['max_queries']} queries, "
+            f"status {result['status_code']}"
+            for result in report['endpoints'] if not result['passed']
+        ]
+        self.assertEqual(failures, [])
+        self.assertTrue(report['checkout_scaling']['passed'], report['checkout_scaling'])
+        self.assertEqual([payload['name'] for payload in report['payloads']], ['menu', 'order_history'])
+        json.dumps(report)  # the report must stay machine-readable
+
+
+class CartSummaryTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.client.force_authenticate(self.customer)
+
+    def test_summary_is_one_aggregate_query(self):
+        CartItems.objects.create(user=self.customer, item=make_item(self.admin, price='2.50'), quantity=2)
+        CartItems.objects.create(user=self.customer, item=make_item(self.admin, price='4.00'), quantity=3)
+        # Ordered lines are not part of the open cart
+        CartItems.objects.create(user=self.customer, item=make_item(self.admin), ordered=True)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('core:cart-summary'))
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(response.data, {
+            'line_count': 2, 'total_quantity': 5, 'subtotal': Decimal('17.00')
+        })
+
+    def test_empty_cart(self):
+        response = self.client.get(reverse('core:cart-summary'))
+        self.assertEqual(response.data['line_count'], 0)
+        self.assertEqual(response.data['subtotal'], Decimal('0.00'))
+
+
+class CartBatchTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.client.force_authenticate(self.customer)
+        self.url = reverse('core:cart-batch')
+
+    def post_batch(self, operations):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'operations': operations}, format='json')
+        return response, len(ctx.captured_queries)
+
+    def test_add_set_and_remove(self):
+        burger, fries, cola = (make_item(self.admin, title=t) for t in ('Burger', 'Fries', 'Cola'))
+        CartItems.objects.create(user=self.customer, item=cola, quantity=4)
+
+        response, _ = self.post_batch([
+            {'slug': burger.slug, 'quantity': 3},
+            {'item_id': fries.id, 'quantity': 2},
+            {'slug': burger.slug, 'action': 'set', 'quantity': 1},
+            {'item_id': cola.id, 'action': 'remove'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        quantities = {row['item']['title']: row['quantity'] for row in response.data['items']}
+        self.assertEqual(quantities, {'Burger': 1, 'Fries': 2})
+        self.assertEqual(response.data['summary']['total_quantity'], 3)
+
+    def test_query_count_does_not_grow_with_operations(self):
+        items = [make_item(self.admin, title=f'Item {i}') for i in range(10)]
+        _, few = self.post_batch([{'slug': item.slug} for item in items[:2]])
+        CartItems.objects.all().delete()
+        _, many = self.post_batch([{'slug': item.slug} for item in items])
+        self.assertEqual(few, many)
+
+    def test_unknown_item_rejects_whole_batch(self):
+        burger = make_item(self.admin)
+        response, _ = self.post_batch([{'slug': burger.slug}, {'slug': 'no-such-item'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['missing'], ['no-such-item'])
+        self.assertFalse(CartItems.objects.exists())
+
+
+class AddToCartConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    TAPS_PER_THREAD = 10
+
+    def setUp(self):
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.item = make_item(self.admin)
+        self.url = reverse('core:add-to-cart', kwargs={'slug': self.item.slug})
+
+    def tap(self, errors):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        try:
+            for _ in range(self.TAPS_PER_THREAD):
+                response = client.post(self.url)
+                if response.status_code != 201:
+                    errors.append(response.status_code)
+        except Exception as exc:  # surfaced through the errors list
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    def test_concurrent_taps_are_not_lost(self):
+        errors = []
+        threads = [
+            threading.Thread(target=self.tap, args=(errors,)) for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        rows = CartItems.objects.active_for(self.customer)
+        self.assertEqual(rows.count(), 1)
+        self.assertEqual(rows.get().quantity, self.THREADS * self.TAPS_PER_THREAD)
+
+    def test_single_active_row_per_item(self):
+        CartItems.objects.create(user=self.customer, item=self.item)
+        with self.assertRaises(IntegrityError):
+            CartItems.objects.create(user=self.customer, item=self.item)
+
+
+class OrderLineSnapshotTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.client.force_authenticate(self.customer)
+        self.item = make_item(self.admin, title='Burger', price='5.00')
+        CartItems.objects.create(user=self.customer, item=self.item, quantity=2)
+        response = self.client.post(
+            reverse('core:order-create'),
+            {'delivery_option': 'pickup', 'pickup_branch': 'atlas1'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_history_keeps_price_paid(self):
+        self.item.title = 'Royal Burger'
+        self.item.price = Decimal('9.00')
+        self.item.save()
+
+        line = self.client.get(reverse('core:order-history')).data['results'][0]['items'][0]
+        self.assertEqual(line['item'], {'id': self.item.id, 'title': 'Burger', 'price': '5.00'})
+        self.assertEqual(line['item_price'], '5.00')
+        self.assertEqual(line['line_total'], '10.00')
+        self.assertTrue(line['item_image'].endswith('/media/images/burger.jpg'))
+
+    def test_history_does_not_read_items(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('core:order-history'))
+        self.assertFalse([q for q in ctx.captured_queries if 'core_item' in q['sql']])
+
+
+class OrderKeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = make_user('customer')
+        self.client.force_authenticate(self.customer)
+        self.orders = [
+            Order.objects.create(user=self.customer, total_price=1) for _ in range(7)
+        ]
+        # Ties on created_at must still page deterministically (by id)
+        Order.objects.filter(id__in=[o.id for o in self.orders[2:5]])\
+            .update(created_at=self.orders[2].created_at)
+
+    def collect(self, url):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids += [order['id'] for order in response.data['results']]
+            url = response.data['next']
+        return ids, pages
+
+    def test_walks_every_order_once_newest_first(self):
+        ids, pages = self.collect(reverse('core:order-history') + '?page_size=3')
+        expected = list(
+            Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link_returns_prior_page(self):
+        _, pages = self.collect(reverse('core:order-history') + '?page_size=3')
+        response = self.client.get(pages[1]['previous'])
+        self.assertEqual(response.data['results'], pages[0]['results'])
+
+    @override_settings(ORDER_MAX_PAGE_SIZE=5)
+    def test_page_size_is_capped(self):
+        response = self.client.get(reverse('core:order-history') + '?page_size=500')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('core:order-history') + '?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+
+class DailySalesRollupTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.burger = make_item(self.admin, title='Burger', price='5.00')
+        self.cola = make_item(self.admin, title='Cola', price='1.50')
+
+    def place_order(self, lines, branch='atlas1'):
+        for item, quantity in lines:
+            CartItems.objects.create(user=self.customer, item=item, quantity=quantity)
+        self.client.force_authenticate(self.customer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('core:order-create'),
+                {'delivery_option': 'pickup', 'pickup_branch': branch},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def rollup_rows(self):
+        return sorted(
+            DailySalesRollup.objects.filter(order_count__gt=0).values_list(
+                'day', 'pickup_branch', 'status', 'scope', 'item_id',
+                'order_count', 'line_count', 'units', 'revenue'
+            )
+        )
+
+    def test_incremental_rollup_matches_rebuild(self):
+        self.place_order([(self.burger, 2), (self.cola, 1)])
+        order_id = self.place_order([(self.burger, 1)], branch='atlas2')
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('core:admin-orders-update-status', kwargs={'pk': order_id}),
+                {'status': 'Delivered'}
+            )
+
+        incremental = self.rollup_rows()
+        rollup.rebuild()
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_dashboard_reads_rollup(self):
+        self.place_order([(self.burger, 2), (self.cola, 1)])
+        self.place_order([(self.burger, 1)])
+        self.client.force_authenticate(self.admin)
+
+        stats = self.client.get(reverse('core:admin-dashboard')).data
+        self.assertEqual(stats['total_orders'], 2)
+        self.assertEqual(stats['recent_orders'], 2)
+        self.assertEqual(stats['total_revenue'], Decimal('16.50'))
+        self.assertEqual(list(stats['status_distribution']), [{'status': 'Active', 'count': 2}])
+        self.assertEqual(stats['popular_items'][0], {'item__title': 'Burger', 'count': 2})
+
+        analytics = self.client.get(reverse('core:admin-sales-analytics')).data
+        self.assertEqual(analytics['orders'], [2])
+        self.assertEqual(analytics['revenue'], [16.5])
+
+    def test_status_change_while_creating_counts_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(user=self.customer, total_price=Decimal('5.00'), pickup_branch='atlas1')
+            order.status = 'Processing'
+            order.save()
+        incremental = self.rollup_rows()
+        rollup.rebuild()
+        self.assertEqual(self.rollup_rows(), incremental)
+        self.assertEqual([row[2] for row in incremental], ['Processing'])
+
+    def test_deleting_order_removes_it(self):
+        order_id = self.place_order([(self.burger, 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.get(pk=order_id).delete()
+        self.assertEqual(self.rollup_rows(), [])
+
+
+class HotQueryIndexTests(TestCase):
+    """
+    EXPLAIN every hot query from core.views and payments.views on seeded data
+    and fail if the plan falls back to scanning a whole table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        fixtures = seed(users=30, items=40, cart_items=600, orders=300)
+        cls.customer = fixtures['customer']
+        CartItems.objects.create(user=cls.customer, item_id=fixtures['item_ids'][0])
+        cls.item = Item.objects.first()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def full_scans(self, queryset):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Tiny test tables always look cheaper to scan; ask for the index plan
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return re.findall(r'Seq Scan on (\w+)', queryset.explain())
+        # SQLite: "SCAN table" (optionally via an index, i.e. a full index walk)
+        return re.findall(r'\bSCAN (\w+)', queryset.explain())
+
+    def assertUsesIndex(self, queryset):
+        self.assertEqual(self.full_scans(queryset), [], str(queryset.query))
+
+    def view_queryset(self, view_class, user=None, query_params=None, **kwargs):
+        view = view_class()
+        view.request = SimpleNamespace(user=user or self.customer, query_params=query_params or {})
+        view.kwargs = kwargs
+        return view.get_queryset()
+
+    def keyset_page(self, queryset):
+        edge = Order.objects.order_by('-created_at', '-id')[50]
+        return queryset.filter(
+            Q(created_at__lt=edge.created_at) | Q(created_at=edge.created_at, id__lt=edge.id)
+        ).order_by('-created_at', '-id')[:21]
+
+    def test_cart_queries(self):
+        self.assertUsesIndex(active_cart_items(self.customer))
+        self.assertUsesIndex(CartItems.objects.active_for(self.customer).order_by('id'))
+
+    def test_detects_table_scan(self):
+        # Sanity check on the plan parser: delivery_address has no index
+        self.assertTrue(self.full_scans(Order.objects.filter(delivery_address='Bole road')))
+
+    def test_order_history(self):
+        queryset = self.view_queryset(OrderHistoryView)
+        self.assertUsesIndex(queryset.order_by('-created_at', '-id')[:21])
+        self.assertUsesIndex(self.keyset_page(queryset))
+        self.assertUsesIndex(CartItems.objects.filter(order_id__in=[1, 2, 3]))
+
+    def test_admin_order_filters(self):
+        queryset = self.view_queryset(AdminOrderViewSet, query_params={'status': 'Active'})
+        self.assertUsesIndex(queryset.order_by('-created_at', '-id')[:21])
+        today = timezone.localdate().isoformat()
+        queryset = self.view_queryset(
+            AdminOrderViewSet, query_params={'start_date': today, 'end_date': today}
+        )
+        self.assertUsesIndex(queryset.order_by('-created_at', '-id')[:21])
+
+    def test_reviews(self):
+        self.assertUsesIndex(self.view_queryset(ReviewListCreateView, slug=self.item.slug))
+
+    def test_payment_lookups(self):
+        self.assertUsesIndex(PaymentTransaction.objects.filter(tx_ref='chapa-123'))
+        self.assertUsesIndex(
+            PaymentTransaction.objects.filter(user=self.customer).order_by('-created_at')
+        )
+
+    def test_sales_rollup(self):
+        self.assertUsesIndex(DailySalesRollup.objects.filter(scope='order', day__gte=timezone.localdate()))
+
+
+_job_calls = []
+
+
+@jobs.task('tests.record')
+def record_job(payload):
+    _job_calls.append(payload)
+    if payload.get('fail'):
+        raise RuntimeError('boom')
+    if payload.get('permanent'):
+        raise jobs.PermanentJobError('never')
+
+
+@override_settings(JOB_RETRY_BACKOFF=60, JOB_MAX_ATTEMPTS=3)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        _job_calls.clear()
+
+    def test_enqueue_and_work(self):
+        job = jobs.enqueue('tests.record', {'n': 1})
+        self.assertEqual(jobs.work('worker-1', once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(_job_calls, [{'n': 1}])
+
+    def test_old_finished_jobs_are_purged(self):
+        old, recent, dead = (jobs.enqueue('tests.record') for _ in range(3))
+        Job.objects.filter(pk__in=[old.pk, recent.pk]).update(status='done')
+        Job.objects.filter(pk=dead.pk).update(status='dead')
+        Job.objects.exclude(pk=recent.pk).update(updated_at=timezone.now() - timedelta(days=30))
+        self.assertEqual(jobs.purge_finished(), 1)
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {recent.pk, dead.pk})
+
+    def test_key_dedupes_unfinished_jobs(self):
+        first = jobs.enqueue('tests.record', key='payment:1')
+        self.assertEqual(jobs.enqueue('tests.record', key='payment:1'), first)
+        jobs.work('worker-1', once=True)
+        self.assertNotEqual(jobs.enqueue('tests.record', key='payment:1'), first)
+
+    def test_claimed_job_is_not_claimed_again(self):
+        jobs.enqueue('tests.record')
+        self.assertEqual(len(jobs.claim('worker-1')), 1)
+        self.assertEqual(jobs.claim('worker-2'), [])
+
+    def test_orphaned_job_is_reclaimed(self):
+        jobs.enqueue('tests.record')
+        jobs.claim('worker-1')
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.claim('worker-2')[0].locked_by, 'worker-2')
+
+    def test_failure_is_retried_later(self):
+        job = jobs.enqueue('tests.record', {'fail': True})
+        jobs.work('worker-1', once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.last_error)
+        # Not due yet
+        self.assertEqual(jobs.work('worker-1', once=True), 0)
+
+    def test_dead_letter_after_max_attempts(self):
+        job = jobs.enqueue('tests.record', {'fail': True})
+        for _ in range(3):
+            Job.objects.filter(id=job.id).update(run_at=timezone.now())
+            jobs.work('worker-1', once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('dead', 3))
+        self.assertEqual(jobs.retry_dead(), 1)
+
+    def test_permanent_error_skips_retries(self):
+        job = jobs.enqueue('tests.record', {'permanent': True})
+        jobs.work('worker-1', once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('dead', 1))
+
+
+class IdempotentOrderCreateTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.customer = make_user('customer')
+        self.client.force_authenticate(self.customer)
+        self.item = make_item(make_user('chef', is_staff=True))
+        CartItems.objects.create(user=self.customer, item=self.item, quantity=2)
+        self.url = reverse('core:order-create')
+        self.data = {'delivery_option': 'pickup', 'pickup_branch': 'atlas1'}
+
+    def post(self, key, data=None):
+        return self.client.post(
+            self.url, data or self.data, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_response_without_queries(self):
+        first = self.post('order-1')
+        self.assertEqual(first.status_code, 201)
+        with CaptureQueriesContext(connection) as ctx:
+            retry = self.post('order-1')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_new_key_runs_again(self):
+        self.post('order-1')
+        response = self.post('order-2')
+        self.assertEqual(response.status_code, 400)  # cart is empty now
+
+    def test_key_reused_with_different_body(self):
+        self.post('order-1')
+        response = self.post('order-1', {'delivery_option': 'delivery', 'delivery_address': 'Bole'})
+        self.assertEqual(response.status_code, 422)
+
+    def test_key_is_scoped_to_user(self):
+        self.post('order-1')
+        other = make_user('other')
+        CartItems.objects.create(user=other, item=self.item)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.post('order-1').status_code, 201)
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class OrderServiceTests(TestCase):
+
+    def setUp(self):
+        self.customer = make_user('customer')
+        self.admin = make_user('chef', is_staff=True)
+        self.items = [make_item(self.admin, title=f'Item {i}') for i in range(12)]
+        self.data = {'delivery_option': 'pickup', 'pickup_branch': 'atlas1'}
+
+    def fill(self, user, count):
+        CartItems.objects.bulk_create([
+            CartItems(user=user, item=item, quantity=2) for item in self.items[:count]
+        ])
+
+    def checkout_queries(self, user, count):
+        self.fill(user, count)
+        with CaptureQueriesContext(connection) as ctx:
+            OrderService(user).create_from_cart(self.data)
+        return len(ctx.captured_queries)
+
+    def test_creates_order_and_flips_cart(self):
+        self.fill(self.customer, 3)
+        order = OrderService(self.customer).create_from_cart(self.data)
+        self.assertEqual(order.total_price, Decimal('30.00'))
+        self.assertEqual(order.cartitems_set.count(), 3)
+        self.assertFalse(CartItems.objects.active_for(self.customer).exists())
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.score, 1)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        self.assertEqual(
+            self.checkout_queries(self.customer, 1),
+            self.checkout_queries(make_user('big-spender'), 12)
+        )
+
+    def test_empty_cart_and_invalid_details(self):
+        with self.assertRaisesMessage(OrderError, 'cart is empty'):
+            OrderService(self.customer).create_from_cart(self.data)
+        self.fill(self.customer, 1)
+        with self.assertRaises(OrderError):
+            OrderService(self.customer).create_from_cart({'delivery_option': 'delivery'})
+        self.assertFalse(Order.objects.exists())
+
+
+class RecordingBroker(events.Broker):
+    """Stand-in broker that keeps what was published"""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, event):
+        self.published.append((channel, event))
+
+
+@override_settings(ORDER_EVENTS_BROKER='core.tests.RecordingBroker')
+class OrderEventTests(TestCase):
+
+    def setUp(self):
+        events.reset_broker()
+        self.addCleanup(events.reset_broker)
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.client.force_authenticate(self.admin)
+        self.order = Order.objects.create(user=self.customer, total_price=Decimal('5.00'))
+
+    def test_status_change_is_published_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('core:admin-orders-update-status', kwargs={'pk': self.order.pk}),
+                {'status': 'Processing'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        published = events.get_broker().published
+        self.assertEqual(
+            [channel for channel, _ in published],
+            [events.user_channel(self.customer.pk), events.STAFF_CHANNEL]
+        )
+        event = published[0][1]
+        self.assertEqual((event['type'], event['status'], event['previous_status']),
+                         ('order.status', 'Processing', 'Active'))
+
+    def test_unchanged_status_is_not_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.admin_notes = 'Extra napkins'
+            self.order.save()
+        self.assertEqual(events.get_broker().published, [])
+
+    def test_in_process_broker_delivers_to_subscribers(self):
+        broker = events.InProcessBroker()
+
+        async def scenario():
+            subscription = broker.subscribe([events.STAFF_CHANNEL])
+            broker.publish(events.user_channel(1), {'id': 'a'})
+            broker.publish(events.STAFF_CHANNEL, {'id': 'b'})
+            received = [await subscription.get(timeout=1), await subscription.get(timeout=0.05)]
+            subscription.close()
+            return received
+
+        self.assertEqual(async_to_sync(scenario)(), [{'id': 'b'}, None])
+        self.assertEqual(broker._subscriptions, {})
+
+    def test_stream_requires_a_token(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('core:order-events')).status_code, 401)
+
+    def test_event_stream_format(self):
+        broker = events.InProcessBroker()
+
+        async def scenario():
+            stream = event_stream(broker.subscribe([events.STAFF_CHANNEL]), heartbeat=0.01)
+            chunks = [await stream.__anext__(), await stream.__anext__()]
+            broker.publish(events.STAFF_CHANNEL, events.order_event(self.order, 'Active'))
+            chunks.append(await stream.__anext__())
+            await stream.aclose()
+            return chunks
+
+        retry, keep_alive, event = async_to_sync(scenario)()
+        self.assertTrue(retry.startswith('retry: '))
+        self.assertEqual(keep_alive, ': keep-alive\n\n')
+        self.assertIn('event: order.status\n', event)
+        self.assertEqual(json.loads(event.split('data: ')[1])['order_id'], self.order.pk)
+        self.assertEqual(broker._subscriptions, {})
+
+
+class KitchenQueueTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.client.force_authenticate(self.admin)
+        self.item = make_item(self.admin)
+        self.url = reverse('core:kitchen-queue', kwargs={'branch': 'atlas1'})
+
+    def place_order(self, branch='atlas1'):
+        CartItems.objects.create(user=self.customer, item=self.item, quantity=2)
+        return OrderService(self.customer).create_from_cart(
+            {'delivery_option': 'pickup', 'pickup_branch': branch}
+        )
+
+    def test_full_queue_is_compact(self):
+        order = self.place_order()
+        self.place_order(branch='atlas2')
+        data = self.client.get(self.url).data
+        self.assertTrue(data['full'])
+        self.assertEqual([o['id'] for o in data['orders']], [order.id])
+        self.assertEqual(data['orders'][0]['lines'], [{'title': 'Burger', 'quantity': 2}])
+
+    def test_since_returns_only_changes(self):
+        first = self.place_order()
+        second = self.place_order()
+        token = self.client.get(self.url).data['token']
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(self.url, {'since': token}).data
+        self.assertEqual((data['orders'], data['removed']), ([], []))
+        self.assertLessEqual(len(ctx.captured_queries), 2)
+
+        third = self.place_order()
+        first.status = 'Processing'
+        first.save()
+        second.status = 'Delivered'
+        second.save()
+        data = self.client.get(self.url, {'since': token}).data
+        self.assertEqual({o['id'] for o in data['orders']}, {first.id, third.id})
+        self.assertEqual(data['removed'], [second.id])
+        self.assertGreater(int(data['token']), int(token))
+
+    def test_sequence_is_monotonic_across_updates(self):
+        order = self.place_order()
+        seq = order.change_seq
+        order.status = 'Processing'
+        order.save(update_fields=['status'])
+        order.refresh_from_db()
+        self.assertGreater(order.change_seq, seq)
+
+    def test_bad_branch_and_token(self):
+        self.assertEqual(
+            self.client.get(reverse('core:kitchen-queue', kwargs={'branch': 'nowhere'})).status_code, 404
+        )
+        self.assertEqual(self.client.get(self.url, {'since': 'abc'}).status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class MenuSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.burger = make_item(self.admin, title='Cheese Burger', category='burger', labels='bestseller')
+        self.fries = make_item(self.admin, title='Fries', category='side', description='Crispy with cheese dip')
+        self.cola = make_item(self.admin, title='Cola', category='drink')
+        self.url = reverse('core:menu-search')
+
+    def titles(self, query):
+        response = self.client.get(self.url, {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [result['title'] for result in response.data['results']]
+
+    def test_prefix_and_ranking(self):
+        # Title matches outrank description matches
+        self.assertEqual(self.titles('chee'), ['Cheese Burger', 'Fries'])
+
+    def test_typo_tolerance(self):
+        self.assertEqual(self.titles('burgr'), ['Cheese Burger'])
+        self.assertEqual(self.titles('fties'), ['Fries'])
+        self.assertEqual(self.titles('frise'), ['Fries'])  # transposed letters
+        self.assertEqual(self.titles('fryxs'), [])  # too far off
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.titles('cheese best'), ['Cheese Burger'])
+        self.assertEqual(self.titles('cheese cola'), [])
+
+    def test_index_follows_item_changes(self):
+        self.titles('cola')  # build the index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cola.title = 'Lemonade'
+            self.cola.save()
+        version = search.get_index().version
+        self.assertEqual(self.titles('lemon'), ['Lemonade'])
+        self.assertEqual(self.titles('cola'), [])
+        self.assertEqual(search.get_index().version, version)  # updated, not rebuilt
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fries.delete()
+        self.assertEqual(self.titles('fries'), [])
+
+    def test_search_is_served_from_memory(self):
+        self.titles('cola')
+        index = search.get_index()
+        with CaptureQueriesContext(connection) as ctx:
+            results = index.search('burger')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(results[0]['id'], self.burger.id)
+
+    def test_image_urls_are_absolute(self):
+        result = self.client.get(self.url, {'q': 'cola'}).data['results'][0]
+        self.assertTrue(result['image'].startswith('http://testserver/'))
+
+    def test_missing_query(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+
+class MenuFilterFacetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        admin = make_user('chef', is_staff=True)
+        make_item(admin, title='Classic', category='burger', price='6.00', size='m', labels='bestseller')
+        make_item(admin, title='Double', category='burger', price='9.50', size='l')
+        make_item(admin, title='Fries', category='side', price='3.00', size='s', labels='new')
+        make_item(admin, title='Cola', category='drink', price='2.00', size='m')
+        self.url = reverse('core:items-list')
+
+    def titles(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data]
+
+    def test_filters(self):
+        self.assertEqual(self.titles(category='burger'), ['Classic', 'Double'])
+        self.assertEqual(self.titles(category='side,drink'), ['Fries', 'Cola'])
+        self.assertEqual(self.titles(size='m'), ['Classic', 'Cola'])
+        self.assertEqual(self.titles(labels='new'), ['Fries'])
+        self.assertEqual(self.titles(min_price='3', max_price='6'), ['Classic', 'Fries'])
+
+    def test_ordering(self):
+        self.assertEqual(self.titles(ordering='-price'), ['Double', 'Classic', 'Fries', 'Cola'])
+        self.assertEqual(self.titles(ordering='title'), ['Classic', 'Cola', 'Double', 'Fries'])
+
+    def test_invalid_price(self):
+        self.assertEqual(self.client.get(self.url, {'min_price': 'cheap'}).status_code, 400)
+
+    def test_facets_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {'category': 'burger', 'facets': 'true'})
+        # The item list plus one grouped facet query
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual([item['title'] for item in response.data['results']], ['Classic', 'Double'])
+        facets = response.data['facets']
+        self.assertEqual(facets['total'], 4)
+        self.assertEqual(facets['category'], {'burger': 2, 'side': 1, 'drink': 1})
+        self.assertEqual(facets['labels'], {'bestseller': 1, 'new': 1})
+        self.assertEqual(facets['size'], {'m': 2, 'l': 1, 's': 1})
+        self.assertEqual((facets['price']['min'], facets['price']['max']), (Decimal('2.00'), Decimal('9.50')))
+
+    def test_facets_are_cached_per_catalog_version(self):
+        self.client.get(self.url, {'facets': 'true'})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {'category': 'side', 'facets': 'true'})
+        self.assertEqual(len(ctx.captured_queries), 1)  # only the new item page
+        self.assertEqual(response.data['facets']['category']['burger'], 2)
+
+        catalog.bump_catalog_version()
+        facets = self.client.get(self.url, {'min_price': '5', 'facets': 'true'}).data['facets']
+        self.assertEqual(facets['category'], {'burger': 2})
+
+
+def make_image(name='burger.png', size=(800, 400)):
+    from io import BytesIO
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 80, 20)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(ITEM_IMAGE_WIDTHS=(160, 320, 640, 1024))
+class ImageVariantTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.client.force_authenticate(self.admin)
+
+    def test_upload_builds_variants(self):
+        response = self.client.post(reverse('core:items-list'), {
+            'title': 'Burger', 'description': 'Beef', 'category': 'burger', 'size': 'm',
+            'price': '5.00', 'labels': 'new', 'label_colour': 'primary', 'image': make_image(),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        item = Item.objects.get(pk=response.data['id'])
+        self.assertEqual(item.image_variants['source'], item.image.name)
+        # Only widths the 800px original can fill
+        self.assertEqual(sorted(item.image_variants['webp'], key=int), ['160', '320', '640'])
+        for name in images.FORMATS:
+            for path in item.image_variants[name].values():
+                self.assertTrue(default_storage.exists(path))
+
+        srcset = response.data['image_srcset']
+        self.assertEqual(set(srcset), {'webp', 'jpeg'})
+        self.assertRegex(srcset['webp'], r'burger-160\.[0-9a-f]{12}\.webp 160w, .*640w$')
+
+    def test_variants_follow_the_image(self):
+        item = Item.objects.create(title='Burger', price=Decimal('5.00'), image=make_image(), created_by=self.admin)
+        images.ensure_variants(item)
+        first = item.image_variants['jpeg']['160']
+
+        # Unchanged image: nothing is rebuilt
+        with CaptureQueriesContext(connection) as ctx:
+            images.ensure_variants(item)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        old_paths = images.variant_paths(item.image_variants)
+        item.image = make_image('burger2.png', size=(300, 300))
+        item.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            images.ensure_variants(item)
+        self.assertNotEqual(item.image_variants['jpeg']['160'], first)
+        self.assertEqual(list(item.image_variants['jpeg']), ['160'])
+        # The replaced image's variants are gone
+        self.assertFalse(any(default_storage.exists(path) for path in old_paths))
+
+    def test_deleting_item_deletes_variants(self):
+        item = Item.objects.create(title='Burger', price=Decimal('5.00'), image=make_image(), created_by=self.admin)
+        images.ensure_variants(item)
+        paths = images.variant_paths(item.image_variants)
+        self.assertTrue(paths)
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        self.assertFalse(any(default_storage.exists(path) for path in paths))
+
+
+@override_settings(MEDIA_URL='/media/', MEDIA_SENDFILE=None, MEDIA_MAX_AGE=3600, MEDIA_IMMUTABLE_MAX_AGE=31536000)
+class MediaServingTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.body = bytes(range(256)) * 4
+        self.write('images/burger.jpg', self.body)
+        self.write('images/variants/burger-160.3f2a9c1b7d4e.webp', b'RIFFwebp')
+
+    def write(self, path, data):
+        full_path = os.path.join(self.media_root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(data)
+
+    def get(self, path, **headers):
+        return self.client.get(f'/media/{path}', **headers)
+
+    def test_full_response(self):
+        response = self.get('images/burger.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+
+    def test_hashed_names_are_immutable(self):
+        response = self.get('images/variants/burger-160.3f2a9c1b7d4e.webp')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_conditional_requests(self):
+        first = self.get('images/burger.jpg')
+        response = self.get('images/burger.jpg', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        response = self.get('images/burger.jpg', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_ranges(self):
+        response = self.get('images/burger.jpg', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.body[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.body)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.get('images/burger.jpg', HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), self.body[-4:])
+
+        response = self.get('images/burger.jpg', HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.body)}')
+
+        # A stale If-Range gets the whole (changed) file
+        response = self.get('images/burger.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_precompressed_sibling(self):
+        self.write('images/menu.svg', b'<svg/>')
+        self.write('images/menu.svg.gz', b'gzipped')
+        response = self.get('images/menu.svg', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(b''.join(response.streaming_content), b'gzipped')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.get('images/menu.svg')
+        self.assertEqual(b''.join(response.streaming_content), b'<svg/>')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_sendfile(self):
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self.get('images/burger.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/images/burger.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.get('images/burger.jpg')
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, 'images/burger.jpg'))
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.get('images/nope.jpg').status_code, 404)
+        self.assertEqual(self.get('images').status_code, 404)
+        self.assertEqual(self.get('../settings.py').status_code, 404)
+
+
+@override_settings(REVIEW_PAGE_SIZE=2, REVIEW_SUMMARY_LATEST=2)
+class ReviewSummaryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.item = make_item(self.admin)
+        self.list_url = reverse('core:review-list', kwargs={'slug': self.item.slug})
+        self.summary_url = reverse('core:review-summary', kwargs={'slug': self.item.slug})
+
+    def post_review(self, text):
+        self.client.force_authenticate(self.customer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.list_url, {'review': text})
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_pages_newest_first(self):
+        for text in ('one', 'two', 'three'):
+            self.post_review(text)
+        first = self.client.get(self.list_url).data
+        self.assertEqual(first['count'], 3)
+        self.assertEqual([review['review'] for review in first['results']], ['three', 'two'])
+        second = self.client.get(first['next']).data
+        self.assertEqual([review['review'] for review in second['results']], ['one'])
+
+    def test_counter_follows_create_and_delete(self):
+        review_id = self.post_review('one')
+        self.post_review('two')
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.review_count, 2)
+
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('core:admin-review-delete', kwargs={'pk': review_id}))
+        self.assertEqual(response.status_code, 200)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.review_count, 1)
+
+    def test_menu_shows_counts(self):
+        self.client.get(reverse('core:items-list'))  # cached before the review
+        self.post_review('one')
+        items = self.client.get(reverse('core:items-list')).data
+        self.assertEqual(items[0]['review_count'], 1)
+
+    def test_review_does_not_rebuild_search_index(self):
+        search_url = reverse('core:menu-search')
+        self.client.get(search_url, {'q': 'burger'})  # build the index
+        version = search.get_index().version
+        self.post_review('one')
+        results = self.client.get(search_url, {'q': 'burger'}).data['results']
+        self.assertEqual(results[0]['review_count'], 1)
+        self.assertEqual(search.get_index().version, version)
+
+    def test_summary_is_cached(self):
+        for text in ('one', 'two', 'three'):
+            self.post_review(text)
+        response = self.client.get(self.summary_url)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([review['review'] for review in response.data['latest']], ['three', 'two'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.summary_url)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        self.post_review('four')
+        self.assertEqual(self.client.get(self.summary_url).data['latest'][0]['review'], 'four')
+
+    def test_summary_missing_item(self):
+        response = self.client.get(reverse('core:review-summary', kwargs={'slug': 'nope'}))
+        self.assertEqual(response.status_code, 404)
+
+
+class FastJSONRendererTests(TestCase):
+
+    data = {
+        'price': Decimal('4.50'),
+        'created_at': datetime(2026, 10, 17, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'day': date(2026, 10, 17),
+        None: 'no key',
+        'text': 'Caf\u00e9 \u2028 line',
+        'rows': [{'id': 1, 'ok': True, 'missing': None}],
+    }
+
+    def test_matches_drf_output(self):
+        expected = JSONRenderer().render(self.data)
+        for backend in ('orjson', 'stdlib'):
+            with override_settings(API_JSON_BACKEND=backend):
+                self.assertEqual(json.loads(FastJSONRenderer().render(self.data)), json.loads(expected), backend)
+                self.assertIn(b'\\u2028', FastJSONRenderer().render(self.data))
+
+    def test_indent_and_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+        rendered = FastJSONRenderer().render({'a': 1}, 'application/json; indent=2')
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class ResponseCompressionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        admin = make_user('chef', is_staff=True)
+        for i in range(30):
+            make_item(admin, title=f'Burger {i}', description='Beef patty, cheddar, pickles and onions')
+        self.url = reverse('core:items-list')
+
+    def test_large_json_is_compressed(self):
+        plain = self.client.get(self.url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+        # The weakened ETag still validates
+        again = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_small_responses_are_left_alone(self):
+        response = self.client.get(reverse('core:menu-search'), {'q': 'burger', 'limit': 1},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_negotiation(self):
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0, identity'))
+        self.assertIsNone(choose_encoding(''))
+        self.assertIn(choose_encoding('*'), ('br', 'gzip'))
+
+
+class LeanPayloadTests(TestCase):
+    """core.payloads must render exactly what the serializers render"""
+
+    def setUp(self):
+        cache.clear()
+        self.request = APIRequestFactory().get('/')
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.burger = make_item(self.admin, title='Burger', size='m', labels='new', label_colour='info')
+        self.burger.image_variants = {
+            'source': 'images/burger.jpg',
+            'webp': {'160': 'images/variants/burger-160.3f2a9c1b7d4e.webp'},
+            'jpeg': {'160': 'images/variants/burger-160.91c0d2e4a8b7.jpg'},
+        }
+        self.burger.save()
+        self.fries = make_item(self.admin, title='Fries', price='2.5')
+        Item.objects.filter(pk=self.fries.pk).update(image='')
+
+    def assertSameJSON(self, lean, serialized):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(lean), renderer.render(serialized))
+
+    def test_items(self):
+        items = Item.objects.with_creator().order_by('id')
+        self.assertSameJSON(
+            payloads.item_payloads(payloads.item_rows(items), self.request),
+            ItemSerializer(items, many=True, context={'request': self.request}).data,
+        )
+
+    def test_cart(self):
+        CartItems.objects.create(user=self.customer, item=self.burger, quantity=3)
+        CartItems.objects.create(user=self.customer, item=self.fries)
+        lines = active_cart_items(self.customer).order_by('id')
+        self.assertSameJSON(
+            payloads.cart_payloads(payloads.cart_rows(lines), self.request),
+            CartItemSerializer(lines, many=True, context={'request': self.request}).data,
+        )
+
+    def test_orders(self):
+        pickup = Order.objects.create(user=self.customer, total_price=Decimal('7.5'), pickup_branch='atlas2')
+        Order.objects.create(
+            user=self.customer, total_price=Decimal('12'), delivery_option='delivery',
+            delivery_address='Bole road', latitude=Decimal('9.01'), longitude=Decimal('38.7613'),
+            pickup_time=None, cancelled_at=timezone.now(),
+        )
+        CartItems.objects.create(user=self.customer, item=self.burger, quantity=2)
+        CartItems.objects.active_for(self.customer).mark_ordered(pickup)
+        # A line whose item has since been deleted, from before snapshots existed
+        CartItems.objects.create(user=self.customer, item=None, ordered=True, order=pickup)
+
+        orders = Order.objects.select_related('user').prefetch_related('cartitems_set').order_by('-created_at', '-id')
+        self.assertSameJSON(
+            payloads.order_payloads(payloads.order_rows(orders), self.request),
+            OrderSerializer(orders, many=True, context={'request': self.request}).data,
+        )
+
+    def test_endpoints_use_lean_path(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        CartItems.objects.create(user=self.customer, item=self.burger)
+        for url, serializer, queryset in (
+            (reverse('core:items-list'), ItemSerializer, Item.objects.with_creator().order_by('id')),
+            (reverse('core:cart-list'), CartItemSerializer, active_cart_items(self.customer)),
+        ):
+            response = client.get(url)
+            request = response.wsgi_request
+            self.assertEqual(
+                response.content,
+                JSONRenderer().render(serializer(queryset, many=True, context={'request': request}).data),
+            )
+
+
+class FieldSelectionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('chef', is_staff=True)
+        self.customer = make_user('customer')
+        self.burger = make_item(self.admin, title='Burger')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.order = Order.objects.create(user=self.customer, total_price=Decimal('7.5'))
+        CartItems.objects.create(user=self.customer, item=self.burger, quantity=2)
+        CartItems.objects.active_for(self.customer).mark_ordered(self.order)
+        self.line = self.order.cartitems_set.get()
+
+    def test_menu_fields(self):
+        # The menu list is not paginated
+        item = self.client.get(reverse('core:items-list'), {'fields': 'id,title,price,image'}).data[0]
+        self.assertEqual(list(item), ['id', 'title', 'price', 'image'])
+        self.assertTrue(item['image'].endswith('images/burger.jpg'))
+
+    def test_nested_collapses_to_id_unless_expanded(self):
+        url = reverse('core:items-list')
+        item = self.client.get(url, {'fields': 'id,created_by'}).data[0]
+        self.assertEqual(item, {'id': self.burger.id, 'created_by': self.admin.id})
+        item = self.client.get(url, {'fields': 'id', 'expand': 'created_by'}).data[0]
+        self.assertEqual(item['created_by']['username'], 'chef')
+
+    def test_order_history_without_items_skips_lines(self):
+        url = reverse('core:order-history')
+        self.client.get(url)  # warm up
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,status,total_price,created_at'})
+        # Fields keep the serializer's order, not the order asked for
+        self.assertEqual(list(response.data['results'][0]), ['id', 'created_at', 'status', 'total_price'])
+        self.assertFalse([q for q in queries.captured_queries if 'core_cartitems' in q['sql']])
+
+    def test_order_history_items(self):
+        url = reverse('core:order-history')
+        order = self.client.get(url, {'fields': 'id,items'}).data['results'][0]
+        self.assertEqual(order, {'id': self.order.id, 'items': [self.line.id]})
+        order = self.client.get(url, {'fields': 'id', 'expand': 'items'}).data['results'][0]
+        self.assertEqual(order['items'][0]['item_title'], 'Burger')
+
+    def test_serializer_path(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse('core:admin-orders-detail', kwargs={'pk': self.order.pk})
+        self.assertEqual(
+            self.client.get(url, {'fields': 'id,customer,items'}).data,
+            {'id': self.order.id, 'customer': self.customer.id, 'items': [self.line.id]},
+        )
+        order = self.client.get(url, {'fields': 'id', 'expand': 'items,customer'}).data
+        self.assertEqual(order['customer']['username'], 'customer')
+        self.assertEqual(order['items'][0]['quantity'], 2)
+        item = self.client.get(reverse('core:items-detail', kwargs={'slug': self.burger.slug}), {'fields': 'title'})
+        self.assertEqual(item.data, {'title': 'Burger'})
+
+    def test_unknown_fields_rejected(self):
+        self.assertEqual(self.client.get(reverse('core:items-list'), {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('core:cart-list'), {'expand': 'status'}).status_code, 400)
+        response = self.client.get(reverse('core:order-history'), {'fields': 'id,nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
@@ -2,12 +2,13 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
-    ItemListCreateView, ItemDetailView,
-    ReviewListCreateView, ReviewDeleteView, 
-    CartListView, CartDetailView, ClearCartView, 
+    ItemListCreateView, ItemDetailView, MenuSearchView,
+    ReviewListCreateView, ReviewSummaryView, ReviewDeleteView, 
+    CartListView, CartDetailView, CartBatchView, CartSummaryView, ClearCartView, 
     RemoveFromCartView, OrderCreateView, 
-    OrderHistoryView, AdminOrderViewSet
+    OrderHistoryView, KitchenQueueView, AdminOrderViewSet
 )
+from .streams import order_events
 
 app_name = 'core'
 
@@ -19,11 +20,13 @@ router.register(r'api/admin/orders', AdminOrderViewSet, basename='admin-orders')
 urlpatterns = [
     # Menu Items Endpoints
     path('menu/items/', ItemListCreateView.as_view(), name='items-list'),
+    path('menu/search/', MenuSearchView.as_view(), name='menu-search'),
     path('menu/items/<slug:slug>/', ItemDetailView.as_view(), name='items-detail'),
     
 
     # Review Endpoints
     path('menu/items/<slug:slug>/reviews/', ReviewListCreateView.as_view(), name='review-list'),
+    path('menu/items/<slug:slug>/reviews/summary/', ReviewSummaryView.as_view(), name='review-summary'),
 
     # DELETE REVIEW ENDPOINT......... NEEDS TO BE ADDED TO THE MAIN ONE
     path('reviews/<int:pk>/delete/', ReviewDeleteView.as_view(), name='admin-review-delete'),
@@ -31,6 +34,8 @@ urlpatterns = [
     # Cart Endpoints
     path('cart/items/add/<slug:slug>/', CartListView.as_view(), name='add-to-cart'),
     path('cart/', CartListView.as_view(), name='cart-list'),
+    path('cart/batch/', CartBatchView.as_view(), name='cart-batch'),
+    path('cart/summary/', CartSummaryView.as_view(), name='cart-summary'),
     path('cart/clear/', ClearCartView.as_view(), name='cart-clear'),
     path('cart/items/<int:pk>/', CartDetailView.as_view(), name='cart-detail'),
     path('cart/items/<int:pk>/remove/', RemoveFromCartView.as_view(), name='remove-from-cart'),
@@ -39,6 +44,10 @@ urlpatterns = [
     # Order Endpoints
     path('orders/', OrderCreateView.as_view(), name='order-create'),
     path('orders/history/', OrderHistoryView.as_view(), name='order-history'),
+    path('orders/events/', order_events, name='order-events'),
+
+    # Kitchen display
+    path('kitchen/<str:branch>/queue/', KitchenQueueView.as_view(), name='kitchen-queue'),
 
     # Admin Endpoints
     # ======================================================================================
@@ -0,0 +1,64 @@
+"""
+Per-resource version counters.
+
+A version is the nanosecond timestamp of the last change to a resource
+(menu catalog, an item's reviews, a user's orders). It lives in the cache,
+so reading it costs a cache lookup and no database work. Because it is a
+timestamp it doubles as the resource's Last-Modified time.
+
+The VERSION_CACHE_ALIAS cache has to be shared by every worker process
+(Redis or Memcached, see CACHE_URL in settings); core.checks enforces that
+outside DEBUG.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _cache():
+    return caches[getattr(settings, 'VERSION_CACHE_ALIAS', 'default')]
+
+
+def _version_key(name):
+    return f'version:{name}'
+
+
+def get_versions(*names):
+    """Return {name: version} for each resource, seeding missing ones"""
+    keys = {_version_key(name): name for name in names}
+    cache = _cache()
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # A version lost to eviction/restart is re-seeded from the clock,
+        # which is always newer than anything handed out before it
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        found.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in found.items()}
+
+
+def get_version(name):
+    return get_versions(name)[name]
+
+
+def bump_version(name):
+    """Mark a resource as changed (immediately)"""
+    key = _version_key(name)
+    cache = _cache()
+    current = cache.get(key) or 0
+    cache.set(key, max(time.time_ns(), current + 1), timeout=None)
+
+
+def bump_version_on_commit(name):
+    """Mark a resource as changed once the current transaction commits,
+    so readers never see a new version paired with uncommitted data"""
+    transaction.on_commit(lambda: bump_version(name))
+
+
+def version_to_datetime(version):
+    return datetime.fromtimestamp(version / 1e9, tz=dt_timezone.utc)
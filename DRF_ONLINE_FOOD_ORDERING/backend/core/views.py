@@ -3,40 +3,144 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Sum, Count, Prefetch
-from django.db import transaction
-from django.db.models.functions import TruncDay
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+from django.utils.dateparse import parse_date
+from django.db.models import Sum, Q, F, Prefetch
+from django.db import transaction, IntegrityError
+from django.utils.decorators import method_decorator
+from django.conf import settings
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.permissions import IsAdminUser
 
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.filters import OrderingFilter
 
 import logging
 logger = logging.getLogger(__name__)
 
-from .models import Item, CartItems, Reviews, Order
+from .pagination import OrderKeysetPagination, ReviewPagination
+from .models import Item, CartItems, Reviews, Order, DailySalesRollup, deferred_user_fields
+from . import catalog, payloads, reviews, search
+from .fieldsets import FieldSelection
+from .idempotency import idempotent
+from .services import OrderService, OrderError
+from .kitchen import kitchen_queue
+from .conditional import (
+    versioned_condition,
+    menu_resources,
+    review_resources,
+    order_history_resources,
+)
 
 from .serializers import (
     ItemSerializer, 
     ReviewSerializer,
     CartItemSerializer,
+    CartBatchSerializer,
+    CartSummarySerializer,
     OrderSerializer
 )
 
 
 
 # Item Views
-class ItemListCreateView(generics.ListCreateAPIView):
-    """List all items or create new item (admin only)"""
-    queryset = Item.objects.all()
+class CatalogCacheMixin:
+    """Serve GET responses from the versioned menu catalog cache"""
+
+    def get_cached_response(self, request, render, *args, **kwargs):
+        key = catalog.catalog_cache_key(request)
+        data = catalog.get_cached_payload(key)
+        if data is not None:
+            return Response(data)
+
+        response = render(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            catalog.set_cached_payload(key, response.data)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(request, super().retrieve, *args, **kwargs)
+
+
+class LeanListMixin:
+    """
+    Build list responses from ``.values()`` rows with the plain functions in
+    core.payloads (same JSON as serializer_class, a fraction of the CPU);
+    serializer_class still handles single objects and writes.
+    """
+    lean_rows = None
+    lean_payloads = None
+
+    def list(self, request, *args, **kwargs):
+        selection = FieldSelection.from_request(request)
+        rows = self.lean_rows(self.filter_queryset(self.get_queryset()), selection)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.lean_payloads(page, request, selection))
+        return Response(self.lean_payloads(rows, request, selection))
+
+
+@method_decorator(versioned_condition(menu_resources), name='get')
+class ItemListCreateView(CatalogCacheMixin, LeanListMixin, generics.ListCreateAPIView):
+    """
+    List all items or create new item (admin only).
+
+    Filters: ?category=, ?labels=, ?size= (comma-separated values),
+    ?min_price=, ?max_price=; ordering: ?ordering=price|-price|title|-title.
+    ?facets=true wraps the list as {"results", "facets"}, with counts per
+    category/label/size and the price range. Facets apply the price filters
+    but not the category/label/size selection, so every tab keeps its count.
+    """
+    queryset = Item.objects.with_creator().order_by('id')
     serializer_class = ItemSerializer
+    lean_rows = staticmethod(payloads.item_rows)
+    lean_payloads = staticmethod(payloads.item_payloads)
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['price', 'title', 'id']
 
     pagination_class = PageNumberPagination
     page_size = 20
 
+    FACET_FIELDS = ('category', 'labels', 'size')
+
+    def get_price_filters(self):
+        filters = {}
+        for param, lookup in (('min_price', 'price__gte'), ('max_price', 'price__lte')):
+            value = self.request.query_params.get(param)
+            if value:
+                try:
+                    filters[lookup] = Decimal(value)
+                except InvalidOperation:
+                    raise ValidationError({param: f"Invalid price '{value}'"})
+        return filters
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        queryset = queryset.filter(**self.get_price_filters())
+        for field in self.FACET_FIELDS:
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{f'{field}__in': value.split(',')})
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and \
+                request.query_params.get('facets', '').lower() in ('1', 'true', 'yes'):
+            price_filters = self.get_price_filters()
+            facets = catalog.get_facets(Item.objects.filter(**price_filters), price_filters)
+            response.data = {'results': response.data, 'facets': facets}
+        return response
+
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -47,9 +151,28 @@ class ItemListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class ItemDetailView(generics.RetrieveUpdateDestroyAPIView):
+@method_decorator(versioned_condition(menu_resources), name='get')
+class MenuSearchView(APIView):
+    """Ranked prefix/typo-tolerant search over the menu: ?q=<words>&limit=<n>"""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), settings.MENU_SEARCH_MAX_RESULTS)
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search.search(query, max(limit, 1), request)
+        return Response({'query': query, 'count': len(results), 'results': results})
+
+
+@method_decorator(versioned_condition(menu_resources), name='get')
+class ItemDetailView(CatalogCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete an item (admin owner only)"""
-    queryset = Item.objects.all()
+    queryset = Item.objects.with_creator()
     serializer_class = ItemSerializer
     lookup_field = 'slug'
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -75,12 +198,15 @@ class ItemDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Review Views
+@method_decorator(versioned_condition(review_resources), name='get')
 class ReviewListCreateView(generics.ListCreateAPIView):
+    """An item's reviews, newest first, in pages of REVIEW_PAGE_SIZE"""
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ReviewPagination
 
     def get_queryset(self):
-        return Reviews.objects.filter(item__slug=self.kwargs['slug'])
+        return reviews.item_reviews(item__slug=self.kwargs['slug'])
 
     def perform_create(self, serializer):
         item = get_object_or_404(Item, slug=self.kwargs['slug'])
@@ -92,6 +218,18 @@ class ReviewListCreateView(generics.ListCreateAPIView):
         )
 
 
+@method_decorator(versioned_condition(review_resources), name='get')
+class ReviewSummaryView(APIView):
+    """Review count and the newest REVIEW_SUMMARY_LATEST reviews of an item, for menu cards"""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, slug):
+        summary = reviews.review_summary(slug)
+        if summary is None:
+            return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(summary)
+
+
 # ADDED THIS VIEW IT NEEDS TO BE ADDED TO THE MAIN ONE
 class ReviewDeleteView(generics.DestroyAPIView):
     """
@@ -137,30 +275,37 @@ class ReviewDeleteView(generics.DestroyAPIView):
 
 
 # Cart Views
-class CartListView(generics.ListCreateAPIView):
+def active_cart_items(user):
+    """User's open cart rows with everything CartItemSerializer embeds joined in"""
+    return CartItems.objects.active_for(user)\
+        .select_related('user', 'item__created_by')\
+        .defer(*deferred_user_fields('user'), *deferred_user_fields('item__created_by'))
+
+
+class CartListView(LeanListMixin, generics.ListCreateAPIView):
     serializer_class = CartItemSerializer
+    lean_rows = staticmethod(payloads.cart_rows)
+    lean_payloads = staticmethod(payloads.cart_payloads)
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return CartItems.objects.filter(
-            user=self.request.user, 
-            ordered=False
-        ).select_related('item')
+        return active_cart_items(self.request.user)
 
     def create(self, request, *args, **kwargs):
-        item = get_object_or_404(Item, slug=kwargs.get('slug'))
-        
-        cart_item, created = CartItems.objects.get_or_create(
-            item=item,
-            user=request.user,
-            ordered=False,
-            defaults={'quantity': 1}
-        )
-        
-        if not created:
-            cart_item.quantity += 1
-            cart_item.save()
-        
+        item = get_object_or_404(Item.objects.only('id'), slug=kwargs.get('slug'))
+        cart_rows = CartItems.objects.active_for(request.user).filter(item=item)
+
+        # Increment in the database (F expression) so concurrent taps never
+        # lose an update; the unique active-row constraint makes the insert
+        # for a first tap safe to race
+        if not cart_rows.update(quantity=F('quantity') + 1):
+            try:
+                with transaction.atomic():
+                    CartItems.objects.create(item=item, user=request.user, quantity=1)
+            except IntegrityError:
+                cart_rows.update(quantity=F('quantity') + 1)
+
+        cart_item = active_cart_items(request.user).get(item=item)
         serializer = self.get_serializer(cart_item)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -170,7 +315,7 @@ class CartDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return CartItems.objects.filter(user=self.request.user, ordered=False)
+        return active_cart_items(self.request.user)
 
     def patch(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -180,6 +325,95 @@ class CartDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response(serializer.data)
 
 
+class CartBatchView(APIView):
+    """
+    Apply a list of add/set/remove operations to the cart in one transaction.
+    Items are looked up in bulk and rows written with bulk_create/bulk_update,
+    so the query count does not grow with the number of operations.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+
+        slugs = {op['slug'] for op in operations if 'slug' in op}
+        item_ids = {op['item_id'] for op in operations if 'item_id' in op}
+        items = Item.objects.filter(Q(slug__in=slugs) | Q(id__in=item_ids)).only('id', 'slug')
+        id_by_slug = {item.slug: item.id for item in items}
+        known_ids = set(id_by_slug.values())
+
+        missing = sorted(slugs - set(id_by_slug)) + sorted(item_ids - known_ids)
+        if missing:
+            return Response(
+                {"error": "Items not found", "missing": missing},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with transaction.atomic():
+                self.apply(request.user, operations, id_by_slug, known_ids)
+        except IntegrityError:
+            # A concurrent request added one of these items first
+            return Response(
+                {"error": "Cart changed while applying the batch, please retry"},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        cart = active_cart_items(request.user).order_by('id')
+        return Response({
+            'items': CartItemSerializer(cart, many=True, context={'request': request}).data,
+            'summary': CartSummarySerializer(CartItems.objects.active_for(request.user).summary()).data,
+        })
+
+    def apply(self, user, operations, id_by_slug, known_ids):
+        rows = {
+            row.item_id: row
+            for row in CartItems.objects.active_for(user)
+                .select_for_update().filter(item_id__in=known_ids)
+        }
+
+        # Work out the final quantity per item, applying operations in order
+        quantities = {item_id: row.quantity for item_id, row in rows.items()}
+        for op in operations:
+            item_id = id_by_slug[op['slug']] if 'slug' in op else op['item_id']
+            if op['action'] == 'add':
+                quantities[item_id] = quantities.get(item_id, 0) + op['quantity']
+            elif op['action'] == 'set':
+                quantities[item_id] = op['quantity']
+            else:
+                quantities[item_id] = 0
+
+        to_create, to_update, to_delete = [], [], []
+        for item_id, quantity in quantities.items():
+            row = rows.get(item_id)
+            if row is None:
+                if quantity > 0:
+                    to_create.append(CartItems(user=user, item_id=item_id, quantity=quantity))
+            elif quantity <= 0:
+                to_delete.append(row.id)
+            elif quantity != row.quantity:
+                row.quantity = quantity
+                to_update.append(row)
+
+        if to_create:
+            CartItems.objects.bulk_create(to_create)
+        if to_update:
+            CartItems.objects.bulk_update(to_update, ['quantity'])
+        if to_delete:
+            CartItems.objects.filter(id__in=to_delete).delete()
+
+
+class CartSummaryView(APIView):
+    """Line count, quantity and subtotal of the open cart, without the rows"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        summary = CartItems.objects.active_for(request.user).summary()
+        return Response(CartSummarySerializer(summary).data)
+
+
 class ClearCartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -197,7 +431,7 @@ class RemoveFromCartView(generics.DestroyAPIView):
         return CartItems.objects.filter(
             user=self.request.user,
             ordered=False
-        )
+        ).select_related('item')
     
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -212,84 +446,21 @@ class RemoveFromCartView(generics.DestroyAPIView):
 class OrderCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    @transaction.atomic
+    @idempotent
     def post(self, request):
         try:
-            with transaction.atomic():
-                # Lock the cart items to prevent concurrent modifications
-                cart_items = CartItems.objects.select_for_update().filter(
-                    user=request.user,
-                    ordered=False
-                )
-                
-                if not cart_items.exists():
-                    return Response(
-                        {"message": "Your cart is empty"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                delivery_option = request.data.get('delivery_option', 'pickup')
-                delivery_time = request.data.get('delivery_time')
-                pickup_time = request.data.get('pickup_time')
-                delivery_address = request.data.get('delivery_address', '')
-                latitude = request.data.get('latitude')
-                longitude = request.data.get('longitude')
-                pickup_branch = request.data.get('pickup_branch')
-
-                # Set default times if not provided
-                now = timezone.now()
-                if delivery_option == 'pickup' and not pickup_time:
-                    pickup_time = now
-                elif delivery_option == 'delivery' and not delivery_time:
-                    delivery_time = now
-
-                # Validate delivery option specific requirements
-                if delivery_option == 'delivery' and not delivery_address and not (latitude and longitude):
-                    return Response(
-                        {"message": "Either delivery address or location coordinates are required for delivery"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                if delivery_option == 'pickup' and not pickup_branch:
-                    return Response(
-                        {"message": "Pickup branch is required for pickup orders"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                # Create order
-                order = Order.objects.create(
-                    user=request.user,
-                    delivery_option=delivery_option,
-                    pickup_time=pickup_time,
-                    delivery_time=delivery_time,
-                    delivery_address=delivery_address if delivery_option == 'delivery' else None,
-                    latitude=latitude if delivery_option == 'delivery' else None,
-                    longitude=longitude if delivery_option == 'delivery' else None,
-                    pickup_branch=pickup_branch if delivery_option == 'pickup' else None,
-                    total_price=sum(item.quantity * item.item.price for item in cart_items)
-                )
-
-                # Increment user score
-                user = request.user
-                user.score += 1
-                user.save()
-
-                # Update cart items
-                cart_items.update(
-                    ordered=True,
-                    order=order,
-                    status='Active'
-                )
-
-                serializer = OrderSerializer(order, context={'request': request})
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-
+            order = OrderService(request.user).create_from_cart(request.data)
+        except OrderError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {"error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        serializer = OrderSerializer(order, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 
 
 # class OrderCreateView(APIView):
@@ -361,14 +532,41 @@ class OrderCreateView(APIView):
 
 
 
-class OrderHistoryView(generics.ListAPIView):
+class KitchenQueueView(APIView):
+    """
+    Live Active/Processing pickup orders for one branch, in compact form.
+    Pass the previous response's token as ?since= to get only what changed.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, branch):
+        if branch not in dict(Order.BRANCH_CHOICES):
+            return Response({"error": "Unknown branch"}, status=status.HTTP_404_NOT_FOUND)
+
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return Response({"error": "Invalid since token"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(kitchen_queue(branch, since))
+
+
+@method_decorator(versioned_condition(order_history_resources), name='get')
+class OrderHistoryView(LeanListMixin, generics.ListAPIView):
     serializer_class = OrderSerializer
+    lean_rows = staticmethod(payloads.order_rows)
+    lean_payloads = staticmethod(payloads.order_payloads)
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderKeysetPagination
 
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user)\
-            .prefetch_related('cartitems_set', 'cartitems_set__item')\
-            .order_by('-created_at') 
+            .select_related('user')\
+            .defer(*deferred_user_fields('user'))\
+            .prefetch_related('cartitems_set')\
+            .order_by('-created_at')
 
 
 # Admin Views
@@ -385,24 +583,35 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     authentication_classes = [JWTAuthentication]  # Explicitly set JWT auth
     permission_classes = [IsAdminUser]  # Requires both authentication AND staff status
+    pagination_class = OrderKeysetPagination
     # queryset = Order.objects.all().order_by('-created_at')
-    queryset = Order.objects.all().prefetch_related(
-        Prefetch('cartitems_set', queryset=CartItems.objects.select_related('item'))
-    ).order_by('-created_at')
+    queryset = Order.objects.all().select_related('user').defer(
+        *deferred_user_fields('user')
+    ).prefetch_related('cartitems_set').order_by('-created_at')
     
 
     # Override get_queryset to allow filtering by date and status
     def get_queryset(self):
         queryset = super().get_queryset()
+
+        # Only load the lines ?fields= / ?expand= ask for (core/fieldsets.py)
+        selection = FieldSelection.from_request(self.request)
+        if not selection.includes('items'):
+            queryset = queryset.prefetch_related(None)
+        elif not selection.expanded('items'):
+            queryset = queryset.prefetch_related(None).prefetch_related(
+                Prefetch('cartitems_set', queryset=CartItems.objects.only('id', 'order_id'))
+            )
         
-        # Date filtering
+        # Date filtering, as a range on created_at itself so the index is usable
+        # (created_at__date wraps the column in a cast)
         if 'start_date' in self.request.query_params:
             queryset = queryset.filter(
-                created_at__date__gte=self.request.query_params['start_date']
+                created_at__gte=self.start_of_day(self.request.query_params['start_date'])
             )
         if 'end_date' in self.request.query_params:
             queryset = queryset.filter(
-                created_at__date__lte=self.request.query_params['end_date']
+                created_at__lt=self.start_of_day(self.request.query_params['end_date'], days=1)
             )
             
         # Status filtering
@@ -414,6 +623,14 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
         return queryset
 
 
+    @staticmethod
+    def start_of_day(value, days=0):
+        day = parse_date(value) if isinstance(value, str) else None
+        if day is None:
+            raise ValidationError({'date': f"Invalid date '{value}', expected YYYY-MM-DD"})
+        return timezone.make_aware(datetime.combine(day + timedelta(days=days), time.min))
+
+
     # cancel order action
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -503,10 +720,10 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def popular_items(self, request):
         """Get top selling items"""
-        top_items = CartItems.objects.filter(
-            ordered=True
+        top_items = DailySalesRollup.objects.filter(
+            scope='item'
         ).values('item__title', 'item__id', 'item__price') \
-        .annotate(count=Count('item')) \
+        .annotate(count=Sum('line_count')) \
         .order_by('-count')[:10]
         
         return Response(top_items)
@@ -514,32 +731,32 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
     # dashboard action
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
-        """Admin dashboard analytics"""
-        print("Current user:", request.user)  # Debug user
-        print("Is staff:", request.user.is_staff)  # Debug staff status
-        print("Total orders:", self.queryset.count())  # Debug order count
+        """Admin dashboard analytics (read from the daily sales rollup)"""
         today = timezone.now().date()
         last_week = today - timedelta(days=7)
+        order_rollup = DailySalesRollup.objects.filter(scope='order')
+        totals = order_rollup.aggregate(
+            total_orders=Sum('order_count'),
+            total_revenue=Sum('revenue'),
+            recent_orders=Sum('order_count', filter=Q(day__gte=last_week)),
+        )
         
         stats = {
-            'total_orders': self.queryset.count(),
+            'total_orders': totals['total_orders'] or 0,
 
-            'recent_orders': self.queryset.filter(
-                created_at__date__gte=last_week
-            ).count(),
+            'recent_orders': totals['recent_orders'] or 0,
 
-            'total_revenue': self.queryset.aggregate(
-                Sum('total_price')
-            )['total_price__sum'] or 0,
+            'total_revenue': totals['total_revenue'] or 0,
 
-            'status_distribution': self.queryset.values('status')
-                .annotate(count=Count('status'))
+            'status_distribution': order_rollup.values('status')
+                .annotate(count=Sum('order_count'))
+                .filter(count__gt=0)
                 .order_by('-count'),
 
-            'popular_items': CartItems.objects.filter(
-                ordered=True
+            'popular_items': DailySalesRollup.objects.filter(
+                scope='item'
             ).values('item__title')
-                .annotate(count=Count('item'))
+                .annotate(count=Sum('line_count'))
                 .order_by('-count')[:5]
         }
         return Response(stats)
@@ -554,42 +771,26 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
         time_range = request.query_params.get('range', 'weekly')
         
         if time_range == 'weekly':
-            # Get data for last 7 days
-            date_from = timezone.now() - timedelta(days=7)
-            orders = Order.objects.filter(created_at__gte=date_from)
-            
-            # Group by day
-            data = orders.annotate(
-                day=TruncDay('created_at')
-            ).values('day').annotate(
-                order_count=Count('id'),
-                total_revenue=Sum('total_price')
-            ).order_by('day')
-            
-            # Format response
-            result = {
-                'labels': [entry['day'].strftime('%a') for entry in data],
-                'orders': [entry['order_count'] for entry in data],
-                'revenue': [float(entry['total_revenue'] or 0) for entry in data]
-            }
+            # Last 7 days
+            days, label_format = 7, '%a'
         else:
             # Monthly data
-            date_from = timezone.now() - timedelta(days=30)
-            orders = Order.objects.filter(created_at__gte=date_from)
-            
-            # Group by day
-            data = orders.annotate(
-                day=TruncDay('created_at')
-            ).values('day').annotate(
-                order_count=Count('id'),
-                total_revenue=Sum('total_price')
-            ).order_by('day')
-            
-            # Format response
-            result = {
-                'labels': [entry['day'].strftime('%b %d') for entry in data],
-                'orders': [entry['order_count'] for entry in data],
-                'revenue': [float(entry['total_revenue'] or 0) for entry in data]
-            }
+            days, label_format = 30, '%b %d'
+
+        # Group by day
+        date_from = timezone.now().date() - timedelta(days=days)
+        data = DailySalesRollup.objects.filter(
+            scope='order', day__gte=date_from
+        ).values('day').annotate(
+            order_count=Sum('order_count'),
+            total_revenue=Sum('revenue')
+        ).filter(order_count__gt=0).order_by('day')
+
+        # Format response
+        result = {
+            'labels': [entry['day'].strftime(label_format) for entry in data],
+            'orders': [entry['order_count'] for entry in data],
+            'revenue': [float(entry['total_revenue'] or 0) for entry in data]
+        }
         
         return Response(result)
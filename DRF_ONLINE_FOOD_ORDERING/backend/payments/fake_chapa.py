@@ -0,0 +1,148 @@
+"""
+Local stand-in for the Chapa API, for tests and load runs.
+
+Serves the initialize and verify endpoints from a background thread, with
+an optional per-request delay and queued error responses, so the gateway
+client can be exercised (and timed) against a slow or flaky gateway:
+
+    with FakeChapaServer(delay=0.5) as chapa:
+        with override_settings(**chapa.settings()):
+            ...
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INITIALIZE_PATH = '/v1/transaction/initialize'
+VERIFY_PATH = '/v1/transaction/verify/'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'FakeChapa/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self.path.rstrip('/') != INITIALIZE_PATH:
+            return self._reply(404, {'status': 'failed', 'message': 'Not found'})
+        self.server.chapa.handle_initialize(self, body)
+
+    def do_GET(self):
+        if not self.path.startswith(VERIFY_PATH):
+            return self._reply(404, {'status': 'failed', 'message': 'Not found'})
+        self.server.chapa.handle_verify(self, self.path[len(VERIFY_PATH):].strip('/'))
+
+    def _reply(self, status_code, data):
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeChapaServer:
+    def __init__(self, delay=0, secret_key='test-secret'):
+        self.delay = delay  # seconds, added to every response
+        self.secret_key = secret_key
+        self.transactions = {}  # tx_ref -> status
+        self.requests = []  # (method, path), in arrival order
+        self.errors = []  # queued (status_code, data) to answer with first
+        self.in_flight = 0
+        self.peak_in_flight = 0  # most requests being handled at once
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def settings(self):
+        """CHAPA_* overrides pointing the gateway client at this server"""
+        return {
+            'CHAPA_SECRET_KEY': self.secret_key,
+            'CHAPA_API_URL': self.base_url + INITIALIZE_PATH,
+            'CHAPA_VERIFY_URL': self.base_url + VERIFY_PATH,
+        }
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.chapa = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def fail_next(self, status_code, data=None, times=1):
+        """Answer the next ``times`` requests with an error"""
+        data = data or {'status': 'failed', 'message': f'Error {status_code}'}
+        with self._lock:
+            self.errors.extend([(status_code, data)] * times)
+
+    def mark(self, tx_ref, status):
+        """Set what verify reports for a transaction (e.g. 'failed')"""
+        with self._lock:
+            self.transactions[tx_ref] = status
+
+    def _begin(self, handler):
+        with self._lock:
+            self.requests.append((handler.command, handler.path))
+            error = self.errors.pop(0) if self.errors else None
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if handler.headers.get('Authorization') != f'Bearer {self.secret_key}':
+            error = (401, {'status': 'failed', 'message': 'Invalid API Key'})
+        if error:
+            handler._reply(*error)
+            return False
+        return True
+
+    def handle_initialize(self, handler, body):
+        if not self._begin(handler):
+            return
+        tx_ref = body.get('tx_ref')
+        with self._lock:
+            if not tx_ref or tx_ref in self.transactions:
+                return handler._reply(400, {'status': 'failed', 'message': 'Transaction reference has been used before'})
+            self.transactions[tx_ref] = 'success'
+        handler._reply(200, {
+            'status': 'success',
+            'message': 'Hosted Link',
+            'data': {'checkout_url': f'{self.base_url}/checkout/{tx_ref}'},
+        })
+
+    def handle_verify(self, handler, tx_ref):
+        if not self._begin(handler):
+            return
+        with self._lock:
+            status = self.transactions.get(tx_ref)
+        if status is None:
+            return handler._reply(400, {'status': 'failed', 'message': 'Invalid transaction or Transaction not found'})
+        handler._reply(200, {
+            'status': 'success',
+            'message': 'Payment details',
+            'data': {'tx_ref': tx_ref, 'status': status},
+        })
@@ -0,0 +1,152 @@
+"""
+Async Chapa client.
+
+One pooled httpx.AsyncClient per event loop, with per-attempt timeouts and
+retries with exponential backoff on transient failures, so a slow gateway
+holds a coroutine instead of a worker thread. Use it from async views
+served through backend.asgi:
+
+    data = await get_gateway().verify(tx_ref)
+
+Sync code (job workers) goes through call_sync(), which keeps one event
+loop, and so one pooled client, per thread.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Worth retrying: the gateway is overloaded or briefly unavailable
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+class GatewayError(Exception):
+    """Chapa could not be reached or rejected the request"""
+
+    def __init__(self, message, status_code=None, payload=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    @property
+    def transient(self):
+        """True if the gateway was unavailable rather than saying no"""
+        return self.status_code is None or self.status_code >= 500 or self.status_code == 429
+
+
+class ChapaClient:
+    def __init__(self, secret_key=None, initialize_url=None, verify_url=None, transport=None):
+        self.secret_key = secret_key if secret_key is not None else settings.CHAPA_SECRET_KEY
+        self.initialize_url = initialize_url or settings.CHAPA_API_URL
+        self.verify_url = verify_url or settings.CHAPA_VERIFY_URL
+        self.max_retries = settings.CHAPA_MAX_RETRIES
+        self.backoff = settings.CHAPA_RETRY_BACKOFF
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.CHAPA_TIMEOUT, connect=settings.CHAPA_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.CHAPA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CHAPA_MAX_CONNECTIONS,
+            ),
+            headers={'Authorization': f'Bearer {self.secret_key}'},
+            transport=transport,
+        )
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def initialize(self, payload):
+        """Start a checkout; returns Chapa's response data (with checkout_url)"""
+        # Not idempotent on Chapa's side (tx_ref must be unique), so only retry
+        # when the request never reached the gateway
+        return await self._request('POST', self.initialize_url, json=payload, idempotent=False)
+
+    async def verify(self, tx_ref):
+        """Look a transaction up on Chapa; returns its response data if it was paid"""
+        data = await self._request('GET', f"{self.verify_url.rstrip('/')}/{tx_ref}", idempotent=True)
+        # The lookup itself succeeds for pending and failed payments too
+        payment_status = (data.get('data') or {}).get('status')
+        if payment_status != 'success':
+            raise GatewayError(f"Payment {tx_ref} is {payment_status}", status_code=200, payload=data)
+        return data
+
+    async def _request(self, method, url, idempotent, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                response = await self.http.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                error = GatewayError(f"Chapa unreachable: {e!r}")
+            except httpx.TransportError as e:
+                # Sent, but no (complete) answer: only safe to resend a read
+                error = GatewayError(f"Chapa request failed: {e!r}")
+                if not idempotent:
+                    raise error from e
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return self._parse(response)
+                error = GatewayError(
+                    f"Chapa returned {response.status_code}",
+                    status_code=response.status_code, payload=self._json(response),
+                )
+                if not idempotent and response.status_code != 429:
+                    raise error
+
+            if attempt >= self.max_retries:
+                raise error
+            delay = self.backoff * 2 ** attempt
+            attempt += 1
+            logger.warning(f"{error}; retry {attempt}/{self.max_retries} in {delay}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _json(response):
+        try:
+            return response.json()
+        except ValueError:
+            return {'message': response.text[:500]}
+
+    def _parse(self, response):
+        data = self._json(response)
+        if response.status_code != 200 or data.get('status') != 'success':
+            raise GatewayError(
+                data.get('message') or f"Chapa returned {response.status_code}",
+                status_code=response.status_code, payload=data,
+            )
+        return data
+
+
+# httpx clients are bound to the loop they were first used on
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_gateway():
+    """The shared client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = ChapaClient()
+    return client
+
+
+def reset_gateway():
+    """Drop cached clients, e.g. after changing CHAPA_* settings in tests"""
+    _clients.clear()
+
+
+_local = threading.local()
+
+
+def call_sync(method, *args):
+    """Call a ChapaClient method from sync code, e.g. call_sync('verify', tx_ref)"""
+    loop = getattr(_local, 'loop', None)
+    if loop is None:
+        loop = _local.loop = asyncio.new_event_loop()
+
+    async def call():
+        return await getattr(get_gateway(), method)(*args)
+    return loop.run_until_complete(call())
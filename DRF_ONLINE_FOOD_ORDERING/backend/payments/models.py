@@ -11,8 +11,16 @@ class PaymentTransaction(models.Model):
     last_name = models.CharField(max_length=100)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     status = models.CharField(max_length=20, default="pending")
+    metadata = models.JSONField(default=dict, blank=True)  # checkout details for the order
+    order = models.ForeignKey('core.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='payments')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # A user's payments, newest first (tx_ref already has its unique index)
+            models.Index(fields=['user', '-created_at'], name='payment_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.tx_ref} - {self.amount}"
\ No newline at end of file
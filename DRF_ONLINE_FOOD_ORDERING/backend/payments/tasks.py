@@ -0,0 +1,39 @@
+import logging
+
+from core.jobs import PermanentJobError, task
+from core.services import OrderError
+from .gateway import GatewayError, call_sync
+from .models import PaymentTransaction
+from .views import complete_payment
+
+logger = logging.getLogger(__name__)
+
+
+@task('payments.process_payment')
+def process_payment(payload):
+    """Verify a Chapa callback and create the order (enqueued by payment_webhook)"""
+    tx_ref = payload['tx_ref']
+    transaction_obj = PaymentTransaction.objects.filter(tx_ref=tx_ref).first()
+    if transaction_obj is None:
+        raise PermanentJobError(f"Transaction not found for tx_ref {tx_ref}")
+    if transaction_obj.status == "success":
+        return
+
+    # VERIFY payment with Chapa (no transaction or lock held while we wait)
+    try:
+        call_sync('verify', tx_ref)
+    except GatewayError as e:
+        if e.transient:
+            raise  # retried with backoff by the job queue
+        PaymentTransaction.objects.filter(tx_ref=tx_ref).exclude(status="success")\
+            .update(status="failed")
+        logger.error(f"Payment verification failed: {e.payload}")
+        return
+
+    # CREATE order now (payment is verified)
+    try:
+        order = complete_payment(tx_ref)
+    except OrderError as e:
+        raise PermanentJobError(f"Order creation failed for {tx_ref}: {e}") from e
+    if order is not None:
+        logger.info(f"Payment {tx_ref} completed as order {order.id}")
@@ -1,3 +1,208 @@
-from django.test import TestCase
+import asyncio
+import itertools
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Item, CartItems, Order, Job
+from .fake_chapa import FakeChapaServer
+from .gateway import ChapaClient, GatewayError, reset_gateway
+from .models import PaymentTransaction
+
+
+User = get_user_model()
+_phone_numbers = itertools.count(251800000000)
+
+
+def make_user(username, **extra):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        phone_number=f'+{next(_phone_numbers)}',
+        **extra
+    )
+
+
+class ChapaTestCase(TestCase):
+    delay = 0
+
+    def setUp(self):
+        self.chapa = FakeChapaServer(delay=self.delay).start()
+        self.addCleanup(self.chapa.stop)
+        overrides = override_settings(CHAPA_RETRY_BACKOFF=0.01, **self.chapa.settings())
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_gateway()
+        self.addCleanup(reset_gateway)
+
+
+class ChapaClientTests(ChapaTestCase):
+
+    def call(self, method, *args):
+        async def run():
+            client = ChapaClient()
+            try:
+                return await getattr(client, method)(*args)
+            finally:
+                await client.aclose()
+        return async_to_sync(run)()
+
+    def test_verify_retries_transient_errors(self):
+        self.chapa.mark('tx-1', 'success')
+        self.chapa.fail_next(503, times=2)
+        data = self.call('verify', 'tx-1')
+        self.assertEqual(data['data']['status'], 'success')
+        self.assertEqual(len(self.chapa.requests), 3)
+
+    def test_verify_gives_up_after_max_retries(self):
+        self.chapa.fail_next(503, times=10)
+        with override_settings(CHAPA_MAX_RETRIES=1):
+            with self.assertRaises(GatewayError) as ctx:
+                self.call('verify', 'tx-1')
+        self.assertTrue(ctx.exception.transient)
+        self.assertEqual(len(self.chapa.requests), 2)
+
+    def test_unpaid_transaction_is_not_transient(self):
+        self.chapa.mark('tx-1', 'failed')
+        with self.assertRaises(GatewayError) as ctx:
+            self.call('verify', 'tx-1')
+        self.assertFalse(ctx.exception.transient)
+
+    def test_initialize_is_not_resent_after_server_error(self):
+        self.chapa.fail_next(502)
+        with self.assertRaises(GatewayError):
+            self.call('initialize', {'tx_ref': 'tx-1', 'amount': '10'})
+        self.assertEqual(len(self.chapa.requests), 1)
+
+    @override_settings(CHAPA_TIMEOUT=0.2, CHAPA_MAX_RETRIES=0)
+    def test_slow_gateway_times_out(self):
+        self.chapa.delay = 1
+        self.chapa.mark('tx-1', 'success')
+        with self.assertRaises(GatewayError) as ctx:
+            self.call('verify', 'tx-1')
+        self.assertTrue(ctx.exception.transient)
+
+
+class SlowGatewayThroughputTests(ChapaTestCase):
+    """Concurrent verifications overlap on one event loop instead of queueing"""
+    delay = 0.3
+
+    def test_concurrent_verifications(self):
+        tx_refs = [f'tx-{i}' for i in range(20)]
+        for tx_ref in tx_refs:
+            self.chapa.mark(tx_ref, 'success')
+
+        async def run():
+            client = ChapaClient()
+            try:
+                return await asyncio.gather(*(client.verify(tx_ref) for tx_ref in tx_refs))
+            finally:
+                await client.aclose()
+
+        results = async_to_sync(run)()
+        self.assertEqual(len(results), len(tx_refs))
+        # Serially only one would ever be in flight at the gateway
+        self.assertGreater(self.chapa.peak_in_flight, 1)
+
+
+class PaymentFlowTests(ChapaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.customer = make_user('customer')
+        admin = make_user('chef', is_staff=True)
+        item = Item.objects.create(
+            title='Burger', price=Decimal('5.00'), image='images/burger.jpg', created_by=admin
+        )
+        CartItems.objects.create(user=self.customer, item=item, quantity=2)
+
+    def initiate(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(
+            reverse('payment-initiate'),
+            {'delivery_option': 'pickup', 'pickup_branch': 'atlas1'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertIn('checkout_url', response.data)
+        return PaymentTransaction.objects.get(user=self.customer)
+
+    def webhook(self, tx_ref):
+        return self.client.get(reverse('payment-webhook'), {'tx_ref': tx_ref})
+
+    def test_webhook_only_queues_the_payment(self):
+        transaction_obj = self.initiate()
+        requests_before = len(self.chapa.requests)
+        for _ in range(2):  # Chapa retrying the callback
+            response = self.webhook(transaction_obj.tx_ref)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['status'], 'queued')
+        self.assertEqual(len(self.chapa.requests), requests_before)
+        self.assertEqual(Job.objects.filter(task='payments.process_payment').count(), 1)
+        self.assertFalse(Order.objects.exists())
+
+    def test_worker_verifies_and_creates_one_order(self):
+        transaction_obj = self.initiate()
+        self.assertEqual(transaction_obj.amount, Decimal('10.00'))
+
+        self.webhook(transaction_obj.tx_ref)
+        self.assertEqual(jobs.work('test-worker', once=True), 1)
+        order = Order.objects.get(user=self.customer)
+        transaction_obj.refresh_from_db()
+        self.assertEqual(transaction_obj.status, 'success')
+        self.assertEqual(transaction_obj.order, order)
+
+        response = self.webhook(transaction_obj.tx_ref)
+        self.assertEqual(response.json()['status'], 'already processed')
+        self.assertEqual(Order.objects.filter(user=self.customer).count(), 1)
+
+    def test_unpaid_payment_is_marked_failed(self):
+        transaction_obj = self.initiate()
+        self.chapa.mark(transaction_obj.tx_ref, 'failed')
+        self.webhook(transaction_obj.tx_ref)
+        jobs.work('test-worker', once=True)
+        transaction_obj.refresh_from_db()
+        self.assertEqual(transaction_obj.status, 'failed')
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(CHAPA_MAX_RETRIES=0)
+    def test_gateway_outage_is_retried_by_the_queue(self):
+        transaction_obj = self.initiate()
+        self.chapa.fail_next(503)
+        self.webhook(transaction_obj.tx_ref)
+        jobs.work('test-worker', once=True)
+        transaction_obj.refresh_from_db()
+        self.assertEqual(transaction_obj.status, 'pending')
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+
+        Job.objects.update(run_at=timezone.now())
+        jobs.work('test-worker', once=True)
+        self.assertTrue(Order.objects.filter(user=self.customer).exists())
+
+    def test_initiate_rejected_by_gateway(self):
+        self.chapa.fail_next(401)
+        self.client.force_authenticate(self.customer)
+        response = self.client.post(reverse('payment-initiate'), {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(PaymentTransaction.objects.get().status, 'failed')
+
+    def test_initiate_with_idempotency_key_charges_once(self):
+        self.client.force_authenticate(self.customer)
+        data = {'delivery_option': 'pickup', 'pickup_branch': 'atlas1'}
+        responses = [
+            self.client.post(reverse('payment-initiate'), data, format='json', HTTP_IDEMPOTENCY_KEY='pay-1')
+            for _ in range(2)
+        ]
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.assertEqual(len(self.chapa.requests), 1)
+        self.assertEqual(PaymentTransaction.objects.count(), 1)
@@ -1,10 +1,9 @@
-import requests
 import uuid
 from django.shortcuts import render, redirect
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
@@ -12,107 +11,38 @@ from django.utils import timezone
 from django.db import transaction
 import logging
 from core.models import Order, CartItems
+from core import jobs
+from core.async_views import AsyncAPIView
+from core.idempotency import idempotent
+from core.services import OrderService
+from .gateway import GatewayError, get_gateway
 from .models import PaymentTransaction
 
 logger = logging.getLogger(__name__)
 
-from django.utils import timezone
-from django.db import transaction
-from core.models import CartItems, Order
-
-def create_order_from_cart(user, data):
-    """
-    Creates an order from user's cart items and clears them.
-    
-    Parameters:
-        user: User instance
-        data: dict containing delivery_option, times, address, location, branch
-    
-    Returns:
-        Order instance
-    Raises:
-        ValueError: if cart is empty or validation fails
-    """
-
-    with transaction.atomic():
-        cart_items = list(
-            CartItems.objects.select_for_update()
-            .filter(user=user, ordered=False)
-            .select_related('item')
-        )
-
-        if not cart_items:
-            raise ValueError("Your cart is empty")
-
-        delivery_option = data.get('delivery_option', 'pickup')
-        delivery_time = data.get('delivery_time')
-        pickup_time = data.get('pickup_time')
-        delivery_address = data.get('delivery_address', '')
-        latitude = data.get('latitude')
-        longitude = data.get('longitude')
-        pickup_branch = data.get('pickup_branch')
-
-        now = timezone.now()
-        if delivery_option == 'pickup' and not pickup_time:
-            pickup_time = now
-        elif delivery_option == 'delivery' and not delivery_time:
-            delivery_time = now
-
-        if delivery_option == 'delivery' and not delivery_address and not (latitude and longitude):
-            raise ValueError("Delivery address or coordinates required for delivery")
-
-        if delivery_option == 'pickup' and not pickup_branch:
-            raise ValueError("Pickup branch is required for pickup orders")
-
-        total_price = sum(item.quantity * item.item.price for item in cart_items)
-
-        order = Order.objects.create(
-            user=user,
-            delivery_option=delivery_option,
-            pickup_time=pickup_time,
-            delivery_time=delivery_time,
-            delivery_address=delivery_address if delivery_option == 'delivery' else None,
-            latitude=latitude if delivery_option == 'delivery' else None,
-            longitude=longitude if delivery_option == 'delivery' else None,
-            pickup_branch=pickup_branch if delivery_option == 'pickup' else None,
-            total_price=total_price
-        )
-
-        for item in cart_items:
-            item.ordered = True
-            item.order = order
-            item.status = 'Active'
-            item.ordered_date = timezone.now()
-            item.save()
 
-        # Increment score
-        user.score += 1
-        user.save()
-
-        return order
-
-
-class PaymentInitiateView(APIView):
+class PaymentInitiateView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def post(self, request):
+    @idempotent
+    async def post(self, request):
         try:
-            cart_items = CartItems.objects.filter(user=request.user, ordered=False)
-            if not cart_items.exists():
+            # Calculate total amount (single aggregate query, no cart rows loaded)
+            cart_summary = await sync_to_async(CartItems.objects.active_for(request.user).summary)()
+            if not cart_summary['line_count']:
                 return Response({"error": "Cart is empty"}, status=400)
 
-            # Calculate total amount
-            amount = sum(item.total_price for item in cart_items)
+            amount = cart_summary['subtotal']
             tx_ref = f"chapa-{uuid.uuid4().hex}"
 
             # Support dynamic return_url for deeplink/mobile
             return_url = request.data.get('return_url')
             if not return_url:
                 return_url = f"{settings.WEB_APP_URL}/payment-success?tx_ref={tx_ref}"
-            callback_url = f"{settings.DOMAIN_URL}/payments/webhook/"
+            callback_url = settings.CHAPA_WEBHOOK_URL
 
             # Save intent (delivery data) in metadata
-            transaction = PaymentTransaction.objects.create(
+            transaction_obj = await PaymentTransaction.objects.acreate(
                 tx_ref=tx_ref,
                 amount=amount,
                 email=request.user.email,
@@ -124,33 +54,34 @@ class PaymentInitiateView(APIView):
                     "delivery_option": request.data.get("delivery_option", "pickup"),
                     "delivery_address": request.data.get("delivery_address"),
                     "delivery_time": request.data.get("delivery_time"),
-                    "pickup_time": request.data.get("pickup_time")
+                    "pickup_time": request.data.get("pickup_time"),
+                    "pickup_branch": request.data.get("pickup_branch"),
+                    "latitude": request.data.get("latitude"),
+                    "longitude": request.data.get("longitude"),
                 }
             )
 
             payload = {
                 "amount": str(amount),
                 "currency": "ETB",
-                "email": transaction.email,
-                "first_name": transaction.first_name,
-                "last_name": transaction.last_name,
-                "phone_number": transaction.phone_number,
+                "email": transaction_obj.email,
+                "first_name": transaction_obj.first_name,
+                "last_name": transaction_obj.last_name,
+                "phone_number": transaction_obj.phone_number,
                 "tx_ref": tx_ref,
                 "callback_url": callback_url,
                 "return_url": return_url,
             }
 
-            headers = {
-                "Authorization": f"Bearer {settings.CHAPA_SECRET_KEY}",
-                "Content-Type": "application/json"
-            }
-
-            response = requests.post(settings.CHAPA_API_URL, json=payload, headers=headers)
-            data = response.json()
-
-            if response.status_code != 200 or data.get("status") != "success":
-                logger.error(f"Failed to initiate payment: {data}")
-                return Response({"error": "Failed to initiate payment", "details": data}, status=400)
+            try:
+                data = await get_gateway().initialize(payload)
+            except GatewayError as e:
+                logger.error(f"Failed to initiate payment: {e} {e.payload}")
+                await PaymentTransaction.objects.filter(pk=transaction_obj.pk).aupdate(status="failed")
+                return Response(
+                    {"error": "Failed to initiate payment", "details": e.payload},
+                    status=502 if e.transient else 400
+                )
 
             return Response({
                 "checkout_url": data['data']['checkout_url']
@@ -160,68 +91,62 @@ class PaymentInitiateView(APIView):
             logger.error(f"Payment initiation error: {e}")
             return Response({"error": str(e)}, status=500)
 
+
+@transaction.atomic
+def complete_payment(tx_ref):
+    """
+    Create the order for a verified payment. The row lock is only taken here,
+    after the gateway has answered. Returns None if another callback got there first.
+    """
+    transaction_obj = PaymentTransaction.objects.select_for_update().get(tx_ref=tx_ref)
+    if transaction_obj.status == "success":
+        return None
+
+    order = OrderService(transaction_obj.user).create_from_cart(transaction_obj.metadata)
+
+    transaction_obj.status = 'success'
+    transaction_obj.order = order
+    transaction_obj.save(update_fields=["status", "order", "updated_at"])
+    return order
+
+
 # webhook for chapa payments
-@csrf_exempt
-def payment_webhook(request):
-    from django.views.decorators.http import require_http_methods
-    with transaction.atomic():
-        tx_ref = request.GET.get('tx_ref') or request.POST.get('tx_ref')
-        status_param = request.GET.get('status') or request.POST.get('status')
+async def payment_webhook(request):
+    tx_ref = request.GET.get('tx_ref') or request.POST.get('tx_ref')
 
-        if not tx_ref:
-            logger.error("Webhook error: Missing tx_ref")
-            return JsonResponse({"error": "Missing tx_ref"}, status=400)
+    if not tx_ref:
+        logger.error("Webhook error: Missing tx_ref")
+        return JsonResponse({"error": "Missing tx_ref"}, status=400)
 
-        try:
-            transaction_obj = PaymentTransaction.objects.select_for_update().get(tx_ref=tx_ref)
+    try:
+        transaction_obj = await PaymentTransaction.objects.aget(tx_ref=tx_ref)
 
-            # If already processed
-            if transaction_obj.status == "success":
-                return JsonResponse({"status": "already processed"}, status=200)
+        # If already processed
+        if transaction_obj.status == "success":
+            return JsonResponse({"status": "already processed"}, status=200)
 
-            # VERIFY payment with Chapa
-            verify_url = f"https://api.chapa.co/v1/transaction/verify/{tx_ref}"
-            headers = {
-                "Authorization": f"Bearer {settings.CHAPA_SECRET_KEY}"
-            }
-            verify_response = requests.get(verify_url, headers=headers).json()
-
-            if verify_response.get("status") != "success":
-                transaction_obj.status = "failed"
-                transaction_obj.save(update_fields=["status"])
-                logger.error(f"Payment verification failed: {verify_response}")
-                return JsonResponse({"error": "Payment verification failed", "details": verify_response}, status=400)
-
-            # CREATE order now (payment is verified)
-            user = transaction_obj.user
-            cart_items = CartItems.objects.filter(user=user, ordered=False)
-
-            if not cart_items.exists():
-                logger.error("Webhook error: Cart is empty at order creation")
-                return JsonResponse({"error": "Cart is empty at order creation"}, status=400)
-
-            meta = transaction_obj.metadata
-            order = create_order_from_cart(user, meta, transaction_obj.amount, status='paid')
-
-            # Update transaction
-            transaction_obj.status = 'success'
-            transaction_obj.order = order
-            transaction_obj.save()
-
-            # Return JSON response for all requests (API-first approach)
-            return JsonResponse({
-                "status": "success", 
-                "order_id": order.id,
-                "tx_ref": tx_ref,
-                "redirect_url": f"{settings.WEB_APP_URL}/payment-success?tx_ref={tx_ref}&status=success"
-            })
+        # Verification and order creation run in a job worker (payments/tasks.py);
+        # Chapa's repeated callbacks for the same tx_ref share one job
+        await sync_to_async(jobs.enqueue)(
+            'payments.process_payment', {'tx_ref': tx_ref}, key=f"payment:{tx_ref}"
+        )
 
-        except PaymentTransaction.DoesNotExist:
-            logger.error(f"Webhook error: Transaction not found for tx_ref {tx_ref}")
-            return JsonResponse({"error": "Transaction not found"}, status=404)
-        except Exception as e:
-            logger.error(f"Webhook error: {e}")
-            return JsonResponse({"error": str(e)}, status=500)
+        # Return JSON response for all requests (API-first approach)
+        return JsonResponse({
+            "status": "queued",
+            "tx_ref": tx_ref,
+            "redirect_url": f"{settings.WEB_APP_URL}/payment-success?tx_ref={tx_ref}&status=success"
+        })
+
+    except PaymentTransaction.DoesNotExist:
+        logger.error(f"Webhook error: Transaction not found for tx_ref {tx_ref}")
+        return JsonResponse({"error": "Transaction not found"}, status=404)
+    except Exception as e:
+        logger.error(f"Webhook error: {e}")
+        return JsonResponse({"error": str(e)}, status=500)
+
+# csrf_exempt() would wrap the coroutine in a sync function on Django 4.2
+payment_webhook.csrf_exempt = True
 
 def payment_success(request):
     """Handle payment success - return JSON for React frontend"""
@@ -90,7 +90,8 @@ const AdminDashboardPage = () => {
       ]);
 
       setStats(statsRes.data);
-      const fetchedOrders = Array.isArray(ordersRes?.data) ? ordersRes.data : [];
+      const ordersData = ordersRes?.data?.results ?? ordersRes?.data;
+      const fetchedOrders = Array.isArray(ordersData) ? ordersData : [];
       setOrders(fetchedOrders);
 
       // Check for new orders
@@ -15,6 +15,8 @@ const ItemDetail = () => {
   const [quantity, setQuantity] = useState(1);
   const [reviewText, setReviewText] = useState('');
   const [reviews, setReviews] = useState([]);
+  const [reviewsNext, setReviewsNext] = useState(null);
+  const [moreReviewsLoading, setMoreReviewsLoading] = useState(false);
   const [cartLoading, setCartLoading] = useState(false);
   const [reviewLoading, setReviewLoading] = useState(false);
   const [isAddingToCart, setIsAddingToCart] = useState(false);
@@ -31,7 +33,9 @@ const ItemDetail = () => {
         ]);
         
         setItem(itemResponse.data);
-        setReviews(reviewsResponse.data);
+        // Reviews come in pages, newest first
+        setReviews(reviewsResponse.data.results);
+        setReviewsNext(reviewsResponse.data.next);
       } catch (err) {
         setError(err.response?.data?.detail || 'Failed to load item details. Please try again later.');
       } finally {
@@ -68,6 +72,23 @@ const ItemDetail = () => {
     }
   };
 
+  const handleLoadMoreReviews = async () => {
+    setMoreReviewsLoading(true);
+    try {
+      const response = await api.get(reviewsNext);
+      setReviews(current => [
+        ...current,
+        // Skip any that shifted onto this page after a new review was posted
+        ...response.data.results.filter(review => !current.some(shown => shown.id === review.id))
+      ]);
+      setReviewsNext(response.data.next);
+    } catch (err) {
+      setError('Failed to load more reviews');
+    } finally {
+      setMoreReviewsLoading(false);
+    }
+  };
+
   const sanitizeReview = (text) => {
     // Remove potentially dangerous HTML/JS but preserve line breaks and basic formatting
     return DOMPurify.sanitize(text, {
@@ -90,7 +111,7 @@ const ItemDetail = () => {
       const response = await api.post(`/menu/items/${slug}/reviews/`, {
         review: sanitizedReview
       });
-      setReviews([...reviews, response.data]);
+      setReviews([response.data, ...reviews]);
       setReviewText('');
       setError(null);
     } catch (err) {
@@ -301,6 +322,16 @@ const ItemDetail = () => {
                   <p className="text-gray-600 text-sm sm:text-base pl-8 sm:pl-11">{review.review}</p>
                 </div>
               ))}
+              {reviewsNext && (
+                <button
+                  type="button"
+                  onClick={handleLoadMoreReviews}
+                  disabled={moreReviewsLoading}
+                  className="w-full bg-white border border-gray-300 hover:bg-gray-100 text-gray-700 py-2 sm:py-3 rounded-lg transition-colors duration-200 disabled:opacity-50 font-medium text-sm sm:text-base"
+                >
+                  {moreReviewsLoading ? 'Loading...' : 'Show more reviews'}
+                </button>
+              )}
             </div>
           )}
 
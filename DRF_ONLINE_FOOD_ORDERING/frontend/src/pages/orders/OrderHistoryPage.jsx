@@ -14,7 +14,7 @@ const OrderHistoryPage = () => {
     const fetchOrders = async () => {
       try {
         const response = await api.get('/orders/history/');
-        setOrders(response.data);
+        setOrders(response.data.results ?? response.data);
       } catch (err) {
         setError('Failed to load order history');
       } finally {
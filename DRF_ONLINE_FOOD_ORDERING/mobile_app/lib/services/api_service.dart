@@ -340,8 +340,14 @@ class ApiService {
 
   Future<List<Map<String, dynamic>>> getOrderHistory() async {
     try {
-      final response = await _dio.get('/orders/history/');
-      final List<dynamic> data = response.data;
+      // Keyset pages of {next, previous, results}, newest first
+      final List<dynamic> data = [];
+      String? next = '/orders/history/';
+      while (next != null) {
+        final response = await _dio.get(next);
+        data.addAll(response.data['results']);
+        next = response.data['next'];
+      }
       return List<Map<String, dynamic>>.from(data);
     } catch (e) {
       print('Get order history error: $e');
@@ -352,7 +358,8 @@ class ApiService {
   Future<List<Review>> fetchReviews(String itemSlug) async {
     try {
       final response = await _dio.get('/menu/items/$itemSlug/reviews/');
-      final List<dynamic> data = response.data;
+      // Newest first; the first page only
+      final List<dynamic> data = response.data['results'];
       return data.map((json) => Review.fromJson(json)).toList();
     } catch (e) {
       print('Fetch reviews error: $e');